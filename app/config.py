@@ -1,5 +1,6 @@
 """Configuration management using environment variables."""
 
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from typing import Optional
 
@@ -12,10 +13,18 @@ class Settings(BaseSettings):
     MONGO_DB_NAME: str = "lumina"
     MONGO_COLLECTION_NAME: str = "documents"
     VECTOR_INDEX_NAME: str = "vector_index"
+    NUM_CANDIDATES_MULTIPLIER: int = 15
+    USE_LOCAL_FAISS: bool = False
+    LOCAL_FAISS_FP16: bool = False
+    USE_BINARY_PREFILTER: bool = False
+    BINARY_PREFILTER_FACTOR: int = 10
 
     # OpenAI Configuration
     OPENAI_API_KEY: Optional[str] = None
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_CACHE_ENABLED: bool = False  # app.eval enables it unless --no-cache
+    EMBEDDING_CACHE_DIR: str = ".embedcache"
+    QUERY_EMBEDDING_CACHE_SIZE: int = 256
     LLM_MODEL: str = "gpt-4o-mini"
 
     # Azure OpenAI Configuration (alternative to OpenAI)
@@ -30,10 +39,17 @@ class Settings(BaseSettings):
     MAX_CHUNK_SIZE: int = 512
     CHUNK_OVERLAP: int = 50
     TOP_K_RESULTS: int = 5
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_SIZE: int = 1000
+    ANSWER_CACHE_THRESHOLD: float = 0.97
+    INGEST_MAX_WORKERS: int = 4
+    INGEST_BATCH_SIZE: int = 500
+    CHUNK_ID_HASH: str = "md5"
+    INGEST_MANIFEST_PATH: Optional[str] = None  # e.g. ".ingest_manifest.sqlite"
 
     # API Configuration
     API_TIMEOUT: int = 30
-    MAX_RETRIES: int = 3
+    MAX_RETRIES: int = Field(3, ge=1)  # attempts, including the first
 
     #Backend URL
     BACKEND_URL: str = "http://localhost:8000"
@@ -1,14 +1,330 @@
 """MongoDB Atlas connection and vector search operations."""
 
 from typing import List, Dict, Any, Optional
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, OperationFailure
+from bson.binary import Binary, BinaryVectorDtype, VECTOR_SUBTYPE
+from pymongo import MongoClient, ReplaceOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
+import numpy as np
+import threading
 import time
 
 from app.config import settings
 from app.utils import log_event
 
 
+# BSON binary vector header for packed little-endian float32 (dtype, padding)
+_FLOAT32_VECTOR_HEADER = BinaryVectorDtype.FLOAT32.value + b"\x00"
+
+
+def pack_embedding(embedding: np.ndarray) -> Binary:
+    """
+    Pack an embedding into a BSON binary vector of float32 values.
+
+    Atlas Vector Search indexes this format natively, and it takes 4 bytes
+    per dimension instead of the 9 needed for an array of BSON doubles. The
+    bytes match Binary.from_vector(..., BinaryVectorDtype.FLOAT32) but come
+    straight from the array buffer instead of a per-element struct.pack.
+
+    Args:
+        embedding: Vector embedding (float32 array or list of floats)
+
+    Returns:
+        BSON Binary with the vector subtype
+    """
+    data = np.asarray(embedding, dtype="<f4").tobytes()
+    return Binary(_FLOAT32_VECTOR_HEADER + data, VECTOR_SUBTYPE)
+
+
+def unpack_embedding(stored) -> np.ndarray:
+    """
+    Decode a stored embedding into a float32 array.
+
+    Args:
+        stored: Packed BSON binary vector, or a legacy list of floats
+
+    Returns:
+        Embedding vector (float32 array)
+    """
+    if isinstance(stored, bytes):
+        return np.frombuffer(stored, dtype="<f4", offset=len(_FLOAT32_VECTOR_HEADER))
+    return np.asarray(stored, dtype=np.float32)
+
+
+def pack_binary_code(embedding: np.ndarray) -> Binary:
+    """
+    Sign-quantize an embedding to 1 bit per dimension (192 bytes for 1536 dims).
+
+    Args:
+        embedding: Vector embedding
+
+    Returns:
+        BSON Binary holding the packed sign bits
+    """
+    return Binary(np.packbits(np.asarray(embedding) > 0).tobytes())
+
+
+# Number of set bits for every byte value, for Hamming distance over packed codes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+class BinaryCodeIndex:
+    """In-memory Hamming-distance index over binary-quantized embeddings."""
+
+    def __init__(self, collection):
+        """
+        Initialize an empty index; codes are loaded on first use.
+
+        Args:
+            collection: MongoDB collection holding the documents
+        """
+        self.collection = collection
+        self.codes: Optional[np.ndarray] = None
+        self.doc_ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the loaded codes so the next lookup reloads the collection."""
+        with self._lock:
+            self.codes = None
+            self.doc_ids = []
+
+    def _load(self):
+        """
+        Load every document's binary code from MongoDB.
+
+        Codes are only written while the prefilter is on, so a collection
+        ingested before it was enabled has documents without one. Candidates
+        drawn from such a partial index would silently exclude those
+        documents, so unless every document has a code the index stays empty
+        and searches run unrestricted until the collection is re-ingested.
+        """
+        start_time = time.time()
+        documents = list(
+            self.collection.find(
+                {"embedding_bq": {"$exists": True}}, {"_id": 1, "embedding_bq": 1}
+            )
+        )
+
+        total = self.collection.count_documents({})
+        if len(documents) < total:
+            log_event(
+                "binary_code_index_incomplete",
+                {"num_codes": len(documents), "num_documents": total},
+                level="WARNING",
+            )
+            documents = []
+
+        self.doc_ids = [doc["_id"] for doc in documents]
+        self.codes = np.array(
+            [np.frombuffer(doc["embedding_bq"], dtype=np.uint8) for doc in documents],
+            dtype=np.uint8,
+        )
+
+        log_event(
+            "binary_code_index_loaded",
+            {
+                "num_documents": len(documents),
+                "latency_ms": round((time.time() - start_time) * 1000, 2),
+            },
+        )
+
+    def candidates(self, query_embedding: np.ndarray, num_candidates: int) -> List[str]:
+        """
+        Return the IDs of the documents closest to the query in Hamming distance.
+
+        Args:
+            query_embedding: Query vector embedding
+            num_candidates: Number of candidate IDs to return
+
+        Returns:
+            Candidate document IDs (unordered)
+        """
+        with self._lock:
+            if self.codes is None:
+                self._load()
+            codes, doc_ids = self.codes, self.doc_ids
+
+        if len(doc_ids) <= num_candidates:
+            return list(doc_ids)
+
+        query_code = np.packbits(np.asarray(query_embedding) > 0)
+        distances = _POPCOUNT[np.bitwise_xor(codes, query_code)].sum(axis=1)
+        nearest = np.argpartition(distances, num_candidates - 1)[:num_candidates]
+        return [doc_ids[i] for i in nearest]
+
+
+class LocalFaissIndex:
+    """In-memory FAISS index over the whole collection for small corpora."""
+
+    def __init__(self, collection):
+        """
+        Initialize an empty index; embeddings are loaded on first search.
+
+        Args:
+            collection: MongoDB collection holding the documents
+        """
+        self.collection = collection
+        self.index = None
+        self.documents: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the loaded index so the next search reloads the collection."""
+        with self._lock:
+            self.index = None
+            self.documents = []
+
+    def _load(self):
+        """Load all embeddings from MongoDB and build the FAISS index."""
+        import faiss
+
+        start_time = time.time()
+        documents = list(
+            self.collection.find({}, {"_id": 1, "text": 1, "metadata": 1, "embedding": 1})
+        )
+        if not documents:
+            return
+
+        vectors = np.vstack([unpack_embedding(doc.pop("embedding")) for doc in documents])
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(vectors)
+
+        dim = vectors.shape[1]
+        if settings.LOCAL_FAISS_FP16:
+            index = faiss.IndexScalarQuantizer(
+                dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(vectors)
+        else:
+            index = faiss.IndexFlatIP(dim)
+        index.add(vectors)
+
+        self.index = index
+        self.documents = documents
+
+        log_event(
+            "local_faiss_index_built",
+            {
+                "num_documents": len(documents),
+                "dimensions": dim,
+                "fp16": settings.LOCAL_FAISS_FP16,
+                "latency_ms": round((time.time() - start_time) * 1000, 2),
+            },
+        )
+
+    def search(self, query_embedding: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Find the top_k most similar documents by cosine similarity.
+
+        Args:
+            query_embedding: Query vector embedding
+            top_k: Number of results to return
+
+        Returns:
+            List of documents with similarity scores
+        """
+        import faiss
+
+        with self._lock:
+            if self.index is None:
+                self._load()
+            index, documents = self.index, self.documents
+
+        if index is None:
+            return []
+
+        query = np.array(query_embedding, dtype=np.float32).reshape(1, -1)
+        faiss.normalize_L2(query)
+        scores, indices = index.search(query, top_k)
+
+        # Map cosine similarity onto Atlas's [0, 1] vectorSearchScore scale
+        return [
+            {**documents[i], "score": (1.0 + float(score)) / 2.0}
+            for score, i in zip(scores[0], indices[0])
+            if i != -1
+        ]
+
+
+class LocalNumpyIndex:
+    """In-memory brute-force cosine index over the whole collection (no FAISS)."""
+
+    def __init__(self, collection):
+        """
+        Initialize an empty index; embeddings are loaded on first search.
+
+        Args:
+            collection: MongoDB collection holding the documents
+        """
+        self.collection = collection
+        self.vectors: Optional[np.ndarray] = None
+        self.documents: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the loaded vectors so the next search reloads the collection."""
+        with self._lock:
+            self.vectors = None
+            self.documents = []
+
+    def _load(self):
+        """Load all embeddings from MongoDB into one unit-row float32 matrix."""
+        start_time = time.time()
+        documents = list(
+            self.collection.find({}, {"_id": 1, "text": 1, "metadata": 1, "embedding": 1})
+        )
+        if not documents:
+            return
+
+        vectors = np.vstack([unpack_embedding(doc.pop("embedding")) for doc in documents])
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+        self.vectors = vectors
+        self.documents = documents
+
+        log_event(
+            "local_numpy_index_built",
+            {
+                "num_documents": len(documents),
+                "dimensions": vectors.shape[1],
+                "latency_ms": round((time.time() - start_time) * 1000, 2),
+            },
+        )
+
+    def search(self, query_embedding: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """
+        Find the top_k most similar documents by cosine similarity.
+
+        Args:
+            query_embedding: Query vector embedding
+            top_k: Number of results to return
+
+        Returns:
+            List of documents with similarity scores
+        """
+        with self._lock:
+            if self.vectors is None:
+                self._load()
+            vectors, documents = self.vectors, self.documents
+
+        if vectors is None:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+
+        # One BLAS matrix-vector product scores the whole collection
+        scores = vectors @ query
+        top_k = min(top_k, len(scores))
+        nearest = np.argpartition(scores, -top_k)[-top_k:]
+        nearest = nearest[np.argsort(scores[nearest])[::-1]]
+
+        # Map cosine similarity onto Atlas's [0, 1] vectorSearchScore scale
+        return [
+            {**documents[i], "score": (1.0 + float(scores[i])) / 2.0} for i in nearest
+        ]
+
+
 class MongoDBClient:
     """MongoDB client wrapper with vector search support."""
 
@@ -17,8 +333,30 @@ class MongoDBClient:
         self.client: Optional[MongoClient] = None
         self.db = None
         self.collection = None
+        self._upsert_count = 0
         self._connect()
 
+        self._binary_index: Optional[BinaryCodeIndex] = None
+        if settings.USE_BINARY_PREFILTER:
+            self._binary_index = BinaryCodeIndex(self.collection)
+
+        self._local_index = None
+        self._local_backend = None
+        if settings.USE_LOCAL_FAISS:
+            try:
+                import faiss  # noqa: F401
+
+                self._local_index = LocalFaissIndex(self.collection)
+                self._local_backend = "local_faiss"
+            except ImportError:
+                log_event(
+                    "local_faiss_unavailable",
+                    {"message": "faiss is not installed; using a NumPy index"},
+                    level="WARNING",
+                )
+                self._local_index = LocalNumpyIndex(self.collection)
+                self._local_backend = "local_numpy"
+
     def _connect(self):
         """Establish connection to MongoDB Atlas."""
         try:
@@ -57,11 +395,38 @@ class MongoDBClient:
             log_event("mongodb_health_check_failed", {"error": str(e)}, level="ERROR")
             return False
 
+    def _invalidate_local_index(self):
+        """Force the in-memory indexes, if any, to reload after a write."""
+        if settings.USE_LOCAL_FAISS and self._local_index is not None:
+            self._local_index.invalidate()
+        if settings.USE_BINARY_PREFILTER and self._binary_index is not None:
+            self._binary_index.invalidate()
+
+    @staticmethod
+    def _build_document(
+        doc_id: str,
+        text: str,
+        embedding: np.ndarray,
+        metadata: Dict[str, Any] = None,
+    ) -> Dict[str, Any]:
+        """Build the stored representation of a document chunk."""
+        document = {
+            "_id": doc_id,
+            "text": text,
+            "embedding": pack_embedding(embedding),
+            "metadata": metadata or {},
+            "created_at": time.time(),
+        }
+        # Binary codes are only read by the prefilter, so only pay for them then
+        if settings.USE_BINARY_PREFILTER:
+            document["embedding_bq"] = pack_binary_code(embedding)
+        return document
+
     def upsert_document(
         self,
         doc_id: str,
         text: str,
-        embedding: List[float],
+        embedding: np.ndarray,
         metadata: Dict[str, Any] = None,
     ) -> str:
         """
@@ -70,34 +435,39 @@ class MongoDBClient:
         Args:
             doc_id: Unique document identifier
             text: Document text content
-            embedding: Vector embedding (list of floats)
+            embedding: Vector embedding (float32 array), stored as a packed
+                BSON binary vector
             metadata: Additional metadata
 
         Returns:
             Document ID
         """
         try:
-            document = {
-                "_id": doc_id,
-                "text": text,
-                "embedding": embedding,
-                "metadata": metadata or {},
-                "created_at": time.time(),
-            }
+            document = self._build_document(doc_id, text, embedding, metadata)
 
             result = self.collection.replace_one(
                 {"_id": doc_id}, document, upsert=True
             )
-
-            log_event(
-                "document_upserted",
-                {
-                    "doc_id": doc_id,
-                    "text_length": len(text),
-                    "embedding_dim": len(embedding),
-                    "modified": result.modified_count > 0,
-                },
-            )
+            self._invalidate_local_index()
+
+            # Per-document logging only at DEBUG; otherwise one summary per 100 docs
+            self._upsert_count += 1
+            if settings.LOG_LEVEL == "DEBUG":
+                log_event(
+                    "document_upserted",
+                    {
+                        "doc_id": doc_id,
+                        "text_length": len(text),
+                        "embedding_dim": len(embedding),
+                        "modified": result.modified_count > 0,
+                    },
+                    level="DEBUG",
+                )
+            elif self._upsert_count % 100 == 0:
+                log_event(
+                    "documents_upserted",
+                    {"total_upserted": self._upsert_count, "last_doc_id": doc_id},
+                )
 
             return doc_id
 
@@ -109,11 +479,85 @@ class MongoDBClient:
             )
             raise
 
+    def upsert_documents_bulk(
+        self,
+        documents: List[Dict[str, Any]],
+        batch_size: int = 1000,
+    ) -> List[str]:
+        """
+        Insert or update many documents with one round-trip per batch.
+
+        Args:
+            documents: Dicts with doc_id, text, embedding and optional metadata
+                (the same arguments as upsert_document)
+            batch_size: Number of documents per bulk_write call
+
+        Returns:
+            List of document IDs
+        """
+        doc_ids = []
+
+        for i in range(0, len(documents), batch_size):
+            batch = documents[i : i + batch_size]
+            ops = [
+                ReplaceOne({"_id": doc["doc_id"]}, self._build_document(**doc), upsert=True)
+                for doc in batch
+            ]
+
+            try:
+                start_time = time.time()
+                result = self.collection.bulk_write(ops, ordered=False)
+                self._invalidate_local_index()
+                latency_ms = (time.time() - start_time) * 1000
+
+                log_event(
+                    "documents_bulk_upserted",
+                    {
+                        "num_documents": len(batch),
+                        "upserted": result.upserted_count,
+                        "modified": result.modified_count,
+                        "latency_ms": round(latency_ms, 2),
+                    },
+                )
+            except BulkWriteError as e:
+                # Unordered writes keep going past individual failures, so the
+                # rest of the batch has been applied; report what did not land.
+                self._invalidate_local_index()
+                details = e.details
+                log_event(
+                    "documents_bulk_upsert_partial_failure",
+                    {
+                        "num_documents": len(batch),
+                        "upserted": details.get("nUpserted", 0),
+                        "modified": details.get("nModified", 0),
+                        "failed_ids": [
+                            err.get("op", {}).get("_id")
+                            for err in details.get("writeErrors", [])
+                        ],
+                        "error": str(e),
+                    },
+                    level="ERROR",
+                )
+                raise
+            except Exception as e:
+                log_event(
+                    "documents_bulk_upsert_failed",
+                    {"num_documents": len(batch), "error": str(e)},
+                    level="ERROR",
+                )
+                raise
+
+            doc_ids.extend(doc["doc_id"] for doc in batch)
+
+        return doc_ids
+
     def mongo_knn_search(
         self,
-        query_embedding: List[float],
+        query_embedding: np.ndarray,
         top_k: int = 5,
         filter_criteria: Dict[str, Any] = None,
+        num_candidates: Optional[int] = None,
+        fields: Optional[List[str]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Perform k-nearest neighbors search using MongoDB Atlas vector search.
@@ -122,6 +566,10 @@ class MongoDBClient:
             query_embedding: Query vector embedding
             top_k: Number of results to return
             filter_criteria: Optional metadata filters
+            num_candidates: HNSW candidates to consider (defaults to
+                top_k * NUM_CANDIDATES_MULTIPLIER, at least 50)
+            fields: Document fields to return besides _id and score
+                (defaults to text and metadata; [] returns IDs only)
 
         Returns:
             List of documents with similarity scores
@@ -129,38 +577,92 @@ class MongoDBClient:
         try:
             start_time = time.time()
 
+            # Small collections can be answered from RAM without a round-trip;
+            # metadata filters still go to Atlas
+            if (
+                settings.USE_LOCAL_FAISS
+                and self._local_index is not None
+                and not filter_criteria
+            ):
+                results = self._local_index.search(query_embedding, top_k)
+                if fields is not None:
+                    keep = {"_id", "score", *fields}
+                    results = [
+                        {k: v for k, v in doc.items() if k in keep} for doc in results
+                    ]
+
+                log_event(
+                    "knn_search_completed",
+                    {
+                        "num_results": len(results),
+                        "top_k": top_k,
+                        "latency_ms": round((time.time() - start_time) * 1000, 2),
+                        "backend": self._local_backend,
+                    },
+                )
+
+                return results
+
+            fields = ["text", "metadata"] if fields is None else fields
+            num_candidates = num_candidates or max(
+                50, top_k * settings.NUM_CANDIDATES_MULTIPLIER
+            )
+
+            vector_search = {
+                "index": settings.VECTOR_INDEX_NAME,
+                "queryVector": pack_embedding(query_embedding),
+                "path": "embedding",
+                "numCandidates": num_candidates,
+                "limit": top_k,
+            }
+
+            # Pre-filter inside $vectorSearch so candidates that would be
+            # discarded are never scored (fields must be indexed as "filter")
+            filters = [filter_criteria] if filter_criteria else []
+
+            # Coarse first stage: Hamming distance over local binary codes picks
+            # the candidate set, Atlas reranks it with the full float vectors.
+            # Skipped with metadata filters: candidates are chosen over the whole
+            # collection, so few of them would pass the filter.
+            if (
+                settings.USE_BINARY_PREFILTER
+                and self._binary_index is not None
+                and not filter_criteria
+            ):
+                candidate_ids = self._binary_index.candidates(
+                    query_embedding, top_k * settings.BINARY_PREFILTER_FACTOR
+                )
+                # No codes loaded (e.g. legacy documents): search unrestricted
+                if candidate_ids:
+                    filters.append({"_id": {"$in": candidate_ids}})
+
+            if len(filters) == 1:
+                vector_search["filter"] = filters[0]
+            elif filters:
+                vector_search["filter"] = {"$and": filters}
+
             # MongoDB Atlas Vector Search aggregation pipeline
-            # Using $search with knnBeta operator
             pipeline = [
+                {"$vectorSearch": vector_search},
                 {
-                    "$vectorSearch": {
-                        "index": settings.VECTOR_INDEX_NAME,
-                        "queryVector": query_embedding,
-                        "path": "embedding",
-                        "numCandidates": 50,
-                        "limit": top_k
-                        }
-                },
-                {
+                    # Inclusion projection: the embedding blob never leaves the server
                     "$project": {
                         "_id": 1,
-                        "text": 1,
-                        "metadata": 1,
                         "score": {"$meta": "searchScore"},
+                        **{field: 1 for field in fields},
                     }
                 },
-                {"$limit": top_k},
             ]
 
-            # Add filter criteria if provided
-            if filter_criteria:
-                # Insert match stage after search
-                pipeline.insert(
-                    1,
-                    {"$match": filter_criteria},
-                )
-
-            results = list(self.collection.aggregate(pipeline))
+            # Return everything in the first reply (no getMore round-trip) and
+            # bound server time so slow queries cannot pin pooled connections
+            cursor = self.collection.aggregate(
+                pipeline,
+                allowDiskUse=False,
+                batchSize=top_k,
+                maxTimeMS=settings.API_TIMEOUT * 1000,
+            )
+            results = list(cursor)
 
             latency_ms = (time.time() - start_time) * 1000
 
@@ -169,6 +671,7 @@ class MongoDBClient:
                 {
                     "num_results": len(results),
                     "top_k": top_k,
+                    "num_candidates": num_candidates,
                     "latency_ms": round(latency_ms, 2),
                     "has_filters": bool(filter_criteria),
                 },
@@ -244,11 +747,15 @@ class MongoDBClient:
 
 # Global MongoDB client instance
 _mongo_client: Optional[MongoDBClient] = None
+_mongo_client_lock = threading.Lock()
 
 
 def get_mongo_client() -> MongoDBClient:
     """Get or create MongoDB client singleton."""
     global _mongo_client
     if _mongo_client is None:
-        _mongo_client = MongoDBClient()
+        # Ingestion workers can get here together on a cold start
+        with _mongo_client_lock:
+            if _mongo_client is None:
+                _mongo_client = MongoDBClient()
     return _mongo_client
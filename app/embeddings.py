@@ -1,43 +1,141 @@
 """Embedding generation with OpenAI/Azure OpenAI, retry logic, and token counting."""
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
+import hashlib
+import threading
 import time
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
+import httpx
+import numpy as np
 from openai import OpenAI, AzureOpenAI, RateLimitError, APIError
 
 from app.config import settings
 from app.utils import log_event, calculate_token_count
 
 
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """L2-normalize in place so cosine similarity reduces to a dot product."""
+    vector /= np.linalg.norm(vector) + 1e-12
+    return vector
+
+
 class EmbeddingClient:
     """Client for generating embeddings with retry and error handling."""
 
     def __init__(self):
         """Initialize OpenAI or Azure OpenAI client."""
+        # One pooled HTTP/2 connection multiplexes concurrent embedding requests
+        self.http_client = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            timeout=settings.API_TIMEOUT,
+        )
+
         if settings.use_azure_openai:
             self.client = AzureOpenAI(
                 api_key=settings.AZURE_OPENAI_API_KEY,
                 api_version=settings.AZURE_OPENAI_API_VERSION,
                 azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                http_client=self.http_client,
             )
             self.embedding_model = settings.AZURE_EMBEDDING_DEPLOYMENT
             log_event("embedding_client_initialized", {"provider": "azure_openai"})
         else:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.client = OpenAI(
+                api_key=settings.OPENAI_API_KEY, http_client=self.http_client
+            )
             self.embedding_model = settings.EMBEDDING_MODEL
             log_event("embedding_client_initialized", {"provider": "openai"})
 
-    @retry(
-        retry=retry_if_exception_type((RateLimitError, APIError)),
-        stop=stop_after_attempt(settings.MAX_RETRIES),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-    )
-    def _call_embedding_api(self, text: str) -> List[float]:
+        # Small in-memory LRU of single-text embeddings (repeated queries)
+        self._recent: Optional["OrderedDict[str, np.ndarray]"] = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+        self.cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            self.enable_cache()
+
+    def enable_cache(self):
+        """Open the on-disk embedding cache at EMBEDDING_CACHE_DIR."""
+        if self.cache is not None:
+            return
+        try:
+            import diskcache
+
+            self.cache = diskcache.Cache(settings.EMBEDDING_CACHE_DIR)
+        except Exception as e:
+            log_event(
+                "embedding_cache_unavailable",
+                {"cache_dir": settings.EMBEDDING_CACHE_DIR, "error": str(e)},
+                level="WARNING",
+            )
+
+    def disable_cache(self):
+        """Stop reading and writing the in-memory and on-disk embedding caches."""
+        with self._recent_lock:
+            self._recent = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+    def _cache_key(self, text: str) -> str:
+        """Build the cache key for a text under the current embedding model."""
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f"{self.embedding_model}:{digest}"
+
+    def _cache_get(self, text: str) -> Optional[np.ndarray]:
+        """Look up a cached embedding, returning None on a miss."""
+        if self.cache is None:
+            return None
+        try:
+            data = self.cache.get(self._cache_key(text))
+        except Exception as e:
+            log_event("embedding_cache_read_failed", {"error": str(e)}, level="WARNING")
+            return None
+        if data is None:
+            return None
+        # Copy so callers get a writable array they own, not a view of the bytes
+        return np.frombuffer(data, dtype=np.float32).copy()
+
+    def _cache_set(self, text: str, embedding: np.ndarray):
+        """Store an embedding as packed float32 bytes; failures are only logged."""
+        if self.cache is None:
+            return
+        try:
+            self.cache.set(self._cache_key(text), embedding.tobytes())
+        except Exception as e:
+            log_event("embedding_cache_write_failed", {"error": str(e)}, level="WARNING")
+
+    def _embed_with_retry(self, inputs: List[str]) -> List[np.ndarray]:
+        """
+        Call OpenAI embedding API for a list of inputs with retry logic.
+
+        Retries rate-limit and API errors with exponential backoff (2-10s),
+        up to MAX_RETRIES attempts, then re-raises the last error.
+
+        Args:
+            inputs: Input texts to embed in one request
+
+        Returns:
+            Unit-length embedding vectors (float32 arrays), in input order
+        """
+        for attempt in range(settings.MAX_RETRIES):
+            try:
+                response = self.client.embeddings.create(
+                    input=inputs,
+                    model=self.embedding_model,
+                )
+                return [
+                    _normalize(np.asarray(item.embedding, dtype=np.float32))
+                    for item in response.data
+                ]
+            except (RateLimitError, APIError):
+                if attempt == settings.MAX_RETRIES - 1:
+                    raise
+                time.sleep(min(10, max(2, 2**attempt)))
+
+    def _call_embedding_api(self, text: str) -> np.ndarray:
         """
         Call OpenAI embedding API with retry logic.
 
@@ -45,15 +143,11 @@ class EmbeddingClient:
             text: Input text to embed
 
         Returns:
-            Embedding vector (list of floats)
+            Unit-length embedding vector (float32 array)
         """
-        response = self.client.embeddings.create(
-            input=text,
-            model=self.embedding_model,
-        )
-        return response.data[0].embedding
+        return self._embed_with_retry([text])[0]
 
-    def get_embedding(self, text: str) -> List[float]:
+    def get_embedding(self, text: str) -> np.ndarray:
         """
         Generate embedding for input text with error handling and logging.
 
@@ -61,7 +155,7 @@ class EmbeddingClient:
             text: Input text to embed
 
         Returns:
-            Embedding vector (list of floats)
+            Unit-length embedding vector (float32 array)
 
         Raises:
             Exception: If embedding generation fails after retries
@@ -74,7 +168,24 @@ class EmbeddingClient:
         token_count = calculate_token_count(text, model=self.embedding_model)
 
         try:
-            embedding = self._call_embedding_api(text)
+            embedding = None
+            with self._recent_lock:
+                if self._recent is not None:
+                    embedding = self._recent.get(text)
+                    if embedding is not None:
+                        self._recent.move_to_end(text)
+            if embedding is None:
+                embedding = self._cache_get(text)
+            cache_hit = embedding is not None
+            if not cache_hit:
+                embedding = self._call_embedding_api(text)
+                self._cache_set(text, embedding)
+
+            with self._recent_lock:
+                if self._recent is not None:
+                    self._recent[text] = embedding
+                    if len(self._recent) > settings.QUERY_EMBEDDING_CACHE_SIZE:
+                        self._recent.popitem(last=False)
             latency_ms = (time.time() - start_time) * 1000
 
             log_event(
@@ -85,6 +196,7 @@ class EmbeddingClient:
                     "embedding_dim": len(embedding),
                     "latency_ms": round(latency_ms, 2),
                     "model": self.embedding_model,
+                    "cache_hit": cache_hit,
                 },
             )
 
@@ -124,36 +236,46 @@ class EmbeddingClient:
             raise
 
     def get_embeddings_batch(
-        self, texts: List[str], batch_size: int = 100
-    ) -> List[List[float]]:
+        self, texts: List[str], batch_size: int = 100, max_workers: int = 5
+    ) -> List[np.ndarray]:
         """
         Generate embeddings for multiple texts in batches.
 
+        Batches are sent concurrently (up to max_workers requests in flight),
+        sharing the pooled HTTP/2 connection.
+
         Args:
             texts: List of input texts
             batch_size: Number of texts to process per API call
+            max_workers: Maximum number of concurrent API calls
 
         Returns:
-            List of embedding vectors
+            List of unit-length embedding vectors (float32 arrays)
         """
         if not texts:
             return []
 
         start_time = time.time()
-        embeddings = []
+        embeddings = [self._cache_get(text) for text in texts]
+        misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
 
         try:
-            # Process in batches
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i : i + batch_size]
+            # Process cache misses in batches
+            batches = [misses[i : i + batch_size] for i in range(0, len(misses), batch_size)]
 
-                response = self.client.embeddings.create(
-                    input=batch,
-                    model=self.embedding_model,
-                )
+            def embed_batch(batch_indices: List[int]) -> List[np.ndarray]:
+                return self._embed_with_retry([texts[j] for j in batch_indices])
+
+            if len(batches) > 1:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    batch_results = list(executor.map(embed_batch, batches))
+            else:
+                batch_results = [embed_batch(batch) for batch in batches]
 
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
+            for batch_indices, batch_embeddings in zip(batches, batch_results):
+                for j, embedding in zip(batch_indices, batch_embeddings):
+                    embeddings[j] = embedding
+                    self._cache_set(texts[j], embedding)
 
             latency_ms = (time.time() - start_time) * 1000
 
@@ -161,6 +283,7 @@ class EmbeddingClient:
                 "batch_embeddings_generated",
                 {
                     "num_texts": len(texts),
+                    "cache_hits": len(texts) - len(misses),
                     "batch_size": batch_size,
                     "latency_ms": round(latency_ms, 2),
                 },
@@ -179,17 +302,21 @@ class EmbeddingClient:
 
 # Global embedding client instance
 _embedding_client: Optional[EmbeddingClient] = None
+_embedding_client_lock = threading.Lock()
 
 
 def get_embedding_client() -> EmbeddingClient:
     """Get or create embedding client singleton."""
     global _embedding_client
     if _embedding_client is None:
-        _embedding_client = EmbeddingClient()
+        # Ingestion workers can get here together on a cold start
+        with _embedding_client_lock:
+            if _embedding_client is None:
+                _embedding_client = EmbeddingClient()
     return _embedding_client
 
 
-def get_embedding(text: str) -> List[float]:
+def get_embedding(text: str) -> np.ndarray:
     """
     Convenience function to generate embedding.
 
@@ -197,7 +324,7 @@ def get_embedding(text: str) -> List[float]:
         text: Input text
 
     Returns:
-        Embedding vector
+        Unit-length embedding vector (float32 array)
     """
     client = get_embedding_client()
     return client.get_embedding(text)
@@ -2,14 +2,36 @@
 
 import os
 import hashlib
+import json
+import sqlite3
+from bisect import bisect_right
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 import re
 
+try:
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
 from app.config import settings
 from app.db import get_mongo_client
 from app.embeddings import get_embedding_client
-from app.utils import log_event
+from app.utils import log_event, calculate_token_counts
+
+
+# File extensions ingest_directory picks up
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".markdown", ".pdf"}
+
+# Runs of whitespace collapsed to a single space before chunking
+_WS_RE = re.compile(r"\s+")
+
+# ASCII characters other than the space that _WS_RE treats as whitespace
+_ASCII_WS_CHARS = "\n\t\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+# Sentence ends (. ! ? followed by a space) in whitespace-normalized text
+_SENTENCE_END_RE = re.compile(r"[.!?] ")
 
 
 def parse_txt_file(file_path: str) -> str:
@@ -34,10 +56,21 @@ def parse_txt_file(file_path: str) -> str:
         raise
 
 
+def _extract_pdf_text_pypdf(file_path: str) -> str:
+    """Extract PDF text with pypdf (pure Python fallback)."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(file_path)
+    return "\n".join(page.extract_text() for page in reader.pages)
+
+
 def parse_pdf_file(file_path: str) -> str:
     """
     Parse PDF file and extract text.
 
+    Uses PyMuPDF (MuPDF, C) when installed and falls back to pypdf, which is
+    pure Python and roughly 10x slower.
+
     Args:
         file_path: Path to PDF file
 
@@ -45,15 +78,15 @@ def parse_pdf_file(file_path: str) -> str:
         Extracted text as string
     """
     try:
-        from pypdf import PdfReader
-
-        reader = PdfReader(file_path)
-        text = ""
+        try:
+            import fitz
+        except ImportError:
+            return _extract_pdf_text_pypdf(file_path)
 
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
+        with fitz.open(file_path) as doc:
+            text_parts = [page.get_text("text") for page in doc]
 
-        return text
+        return "\n".join(text_parts)
     except Exception as e:
         log_event(
             "pdf_parse_failed",
@@ -115,66 +148,101 @@ def parse_file(file_path: str) -> str:
     return parser(file_path)
 
 
-def chunk_text(
+def _normalize_whitespace(text: str) -> str:
+    """Collapse whitespace runs to single spaces, skipping the regex when clean."""
+    # Plain ASCII text with only single spaces is already normalized, which a
+    # few substring scans can confirm much faster than re.sub can copy it
+    if text.isascii() and "  " not in text and not any(c in text for c in _ASCII_WS_CHARS):
+        return text.strip()
+    return _WS_RE.sub(" ", text).strip()
+
+
+def iter_chunks(
     text: str,
     max_chunk_size: int = None,
     overlap: int = None,
-) -> List[str]:
+) -> Iterator[str]:
     """
-    Split text into overlapping chunks.
+    Lazily split text into overlapping chunks.
 
     Args:
         text: Input text to chunk
         max_chunk_size: Maximum characters per chunk
         overlap: Number of overlapping characters between chunks
 
-    Returns:
-        List of text chunks
+    Yields:
+        Text chunks, in order
     """
     max_chunk_size = max_chunk_size or settings.MAX_CHUNK_SIZE
     overlap = overlap or settings.CHUNK_OVERLAP
 
     if not text or not text.strip():
-        return []
+        return
 
     # Normalize whitespace
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _normalize_whitespace(text)
 
-    # If text is shorter than max_chunk_size, return as single chunk
+    # If text is shorter than max_chunk_size, yield it as a single chunk
     if len(text) <= max_chunk_size:
-        return [text]
+        yield text
+        return
+
+    # Find sentence boundaries once; each chunk then needs only a binary search
+    sentence_ends = [m.start() for m in _SENTENCE_END_RE.finditer(text)]
 
-    chunks = []
     start = 0
 
     while start < len(text):
         # Calculate end position
         end = start + max_chunk_size
 
-        # If this is not the last chunk, try to break at sentence or word boundary
-        if end < len(text):
-            # Look for sentence boundary (. ! ? followed by space)
-            sentence_end = max(
-                text.rfind(". ", start, end),
-                text.rfind("! ", start, end),
-                text.rfind("? ", start, end),
-            )
+        # If this is not the last chunk, try to break at sentence or word boundary.
+        # A negative start (overlap reaching before the text) has no boundary
+        # window, matching the str.rfind scan this replaces.
+        if end < len(text) and start >= 0:
+            # Last sentence boundary (. ! ? followed by space) inside the window
+            i = bisect_right(sentence_ends, end - 2) - 1
 
-            if sentence_end > start:
-                end = sentence_end + 1
+            if i >= 0 and sentence_ends[i] > start:
+                end = sentence_ends[i] + 1
             else:
-                # Fall back to word boundary
+                # Fall back to word boundary (the nearest space is at most a
+                # word away, so a backward scan is cheaper than indexing spaces)
                 word_end = text.rfind(" ", start, end)
                 if word_end > start:
                     end = word_end
 
         chunk = text[start:end].strip()
         if chunk:
-            chunks.append(chunk)
+            yield chunk
 
         # Move start position with overlap
         start = end - overlap if end < len(text) else end
 
+
+def chunk_text(
+    text: str,
+    max_chunk_size: int = None,
+    overlap: int = None,
+) -> List[str]:
+    """
+    Split text into overlapping chunks.
+
+    Args:
+        text: Input text to chunk
+        max_chunk_size: Maximum characters per chunk
+        overlap: Number of overlapping characters between chunks
+
+    Returns:
+        List of text chunks
+    """
+    max_chunk_size = max_chunk_size or settings.MAX_CHUNK_SIZE
+    overlap = overlap or settings.CHUNK_OVERLAP
+
+    chunks = list(iter_chunks(text, max_chunk_size, overlap))
+    if not chunks:
+        return []
+
     log_event(
         "text_chunked",
         {
@@ -197,11 +265,21 @@ def generate_chunk_id(file_path: str, chunk_index: int) -> str:
         chunk_index: Index of chunk within file
 
     Returns:
-        Unique chunk ID
+        Unique chunk ID (32 hex chars)
     """
     # Create deterministic ID based on file path and chunk index
-    content = f"{file_path}:{chunk_index}"
-    return hashlib.md5(content.encode()).hexdigest()
+    content = f"{file_path}:{chunk_index}".encode()
+
+    # blake2b/blake3 are faster than md5 but yield different IDs, so
+    # collections ingested with md5 IDs keep it until they are re-ingested
+    if settings.CHUNK_ID_HASH == "blake2b":
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
+    if settings.CHUNK_ID_HASH == "blake3":
+        # No silent fallback: a different hash would orphan existing chunks
+        if blake3 is None:
+            raise ImportError("CHUNK_ID_HASH=blake3 requires the blake3 package")
+        return blake3(content).hexdigest(length=16)
+    return hashlib.md5(content).hexdigest()
 
 
 def ingest_file(
@@ -239,54 +317,58 @@ def ingest_file(
             )
             return []
 
-        # Chunk text
-        chunks = chunk_text(text)
-
-        if not chunks:
-            log_event(
-                "no_chunks_generated",
-                {"file_path": file_path},
-                level="WARNING",
-            )
-            return []
-
         # Get clients
         mongo_client = get_mongo_client()
         embedding_client = get_embedding_client()
 
-        # Process chunks
+        # Chunk strings are small next to their embeddings, so chunk up front
+        # (every document then carries total_chunks) and embed and store a
+        # group at a time, so only one group's embeddings are held in memory
+        chunks = chunk_text(text)
         chunk_ids = []
 
-        for i, chunk in enumerate(chunks):
-            chunk_id = generate_chunk_id(file_path, i)
-
-            # Generate embedding
-            embedding = embedding_client.get_embedding(chunk)
-
-            # Prepare metadata
-            chunk_metadata = {
-                "source_file": file_path,
-                "chunk_index": i,
-                "total_chunks": len(chunks),
-                **(metadata or {}),
-            }
+        for start in range(0, len(chunks), settings.INGEST_BATCH_SIZE):
+            group = chunks[start : start + settings.INGEST_BATCH_SIZE]
+            embeddings = embedding_client.get_embeddings_batch(group)
+            token_counts = calculate_token_counts(group)
+            documents = []
+            for chunk, embedding, token_count in zip(group, embeddings, token_counts):
+                chunk_index = len(chunk_ids)
+                chunk_id = generate_chunk_id(file_path, chunk_index)
+                chunk_ids.append(chunk_id)
+                documents.append(
+                    {
+                        "doc_id": chunk_id,
+                        "text": chunk,
+                        "embedding": embedding,
+                        "metadata": {
+                            "source_file": file_path,
+                            "chunk_index": chunk_index,
+                            "total_chunks": len(chunks),
+                            "token_count": token_count,
+                            **(metadata or {}),
+                        },
+                    }
+                )
 
             # Store in MongoDB
-            mongo_client.upsert_document(
-                doc_id=chunk_id,
-                text=chunk,
-                embedding=embedding,
-                metadata=chunk_metadata,
-            )
+            mongo_client.upsert_documents_bulk(documents)
 
-            chunk_ids.append(chunk_id)
+        if not chunk_ids:
+            log_event(
+                "no_chunks_generated",
+                {"file_path": file_path},
+                level="WARNING",
+            )
+            return []
 
         log_event(
             "ingestion_completed",
             {
                 "file_path": file_path,
                 "num_chunks": len(chunk_ids),
-                "chunk_ids": chunk_ids,
+                "first_chunk_id": chunk_ids[0],
+                "last_chunk_id": chunk_ids[-1],
             },
         )
 
@@ -301,24 +383,135 @@ def ingest_file(
         raise
 
 
+def _file_fingerprint(file_path: str, metadata: Optional[Dict[str, Any]]) -> str:
+    """
+    Fingerprint a file and the settings that shape its chunks.
+
+    Size and mtime stand in for the content, which avoids reading the file;
+    chunking, ID and embedding settings are included so changing any of them
+    forces a re-ingest, as is the target collection so pointing ingestion at
+    a new or emptied collection does not skip files. The Mongo URI is hashed
+    so credentials are not written to the manifest.
+    """
+    stat = os.stat(file_path)
+    return json.dumps(
+        [
+            stat.st_size,
+            stat.st_mtime_ns,
+            metadata,
+            settings.MAX_CHUNK_SIZE,
+            settings.CHUNK_OVERLAP,
+            settings.CHUNK_ID_HASH,
+            settings.EMBEDDING_MODEL,
+            settings.AZURE_EMBEDDING_DEPLOYMENT,
+            hashlib.sha256(settings.MONGO_URI.encode()).hexdigest(),
+            settings.MONGO_DB_NAME,
+            settings.MONGO_COLLECTION_NAME,
+        ],
+        sort_keys=True,
+        default=str,
+    )
+
+
+class IngestManifest:
+    """SQLite record of ingested files, used to skip unchanged ones."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the manifest database.
+
+        Args:
+            path: SQLite database file
+        """
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files "
+            "(path TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, chunk_ids TEXT NOT NULL)"
+        )
+
+    def lookup(self, file_path: str, fingerprint: str) -> Optional[List[str]]:
+        """Return the chunk IDs stored for a file if its fingerprint still matches."""
+        row = self.conn.execute(
+            "SELECT fingerprint, chunk_ids FROM files WHERE path = ?", (file_path,)
+        ).fetchone()
+        if row is None or row[0] != fingerprint:
+            return None
+        return json.loads(row[1])
+
+    def record(self, file_path: str, fingerprint: str, chunk_ids: List[str]):
+        """Store the chunk IDs of a successfully ingested file."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, fingerprint, chunk_ids) VALUES (?, ?, ?)",
+                (file_path, fingerprint, json.dumps(chunk_ids)),
+            )
+
+    def close(self):
+        """Close the manifest database."""
+        self.conn.close()
+
+
+def _iter_supported_files(directory: str, recursive: bool) -> Iterator[str]:
+    """
+    Yield paths of supported files under a directory as they are found.
+
+    Uses os.scandir, whose entries carry the file type from the directory
+    listing, so filtered-out entries cost no extra stat calls or Path objects.
+    Like Path.glob("**/*"), symlinked files are yielded but symlinked
+    directories are not descended into, so link loops cannot recurse forever.
+
+    Args:
+        directory: Directory to walk
+        recursive: Whether to descend into subdirectories
+
+    Yields:
+        File paths, formatted as pathlib would
+    """
+    try:
+        entries = os.scandir(directory)
+    except OSError as e:
+        # Skip unreadable directories (e.g. permissions) rather than abort the walk
+        log_event(
+            "directory_scan_failed",
+            {"directory": directory, "error": str(e)},
+            level="WARNING",
+        )
+        return
+
+    with entries:
+        for entry in entries:
+            if entry.is_file():
+                if os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    yield str(Path(entry.path))
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                yield from _iter_supported_files(entry.path, recursive)
+
+
 def ingest_directory(
     directory_path: str,
     metadata: Dict[str, Any] = None,
     recursive: bool = True,
+    force: bool = False,
 ) -> Dict[str, List[str]]:
     """
     Ingest all supported files in a directory.
 
+    If INGEST_MANIFEST_PATH is set, files whose size, mtime, ingest settings
+    and target collection match the manifest are skipped and reported with
+    their stored chunk IDs.
+
     Args:
         directory_path: Path to directory
         metadata: Metadata to attach to all chunks
         recursive: Whether to recursively process subdirectories
+        force: Re-ingest every file, even if the manifest says it is unchanged
 
     Returns:
         Dictionary mapping file paths to chunk IDs
     """
-    supported_extensions = {".txt", ".md", ".markdown", ".pdf"}
     results = {}
+    manifest = None
+    skipped = 0
 
     try:
         directory = Path(directory_path)
@@ -326,42 +519,61 @@ def ingest_directory(
         if not directory.exists():
             raise FileNotFoundError(f"Directory not found: {directory_path}")
 
-        # Find all supported files
-        pattern = "**/*" if recursive else "*"
-        files = [
-            f
-            for f in directory.glob(pattern)
-            if f.is_file() and f.suffix.lower() in supported_extensions
-        ]
+        if settings.INGEST_MANIFEST_PATH:
+            manifest = IngestManifest(settings.INGEST_MANIFEST_PATH)
 
         log_event(
             "directory_ingestion_started",
-            {
-                "directory": directory_path,
-                "num_files": len(files),
-                "recursive": recursive,
-            },
+            {"directory": directory_path, "recursive": recursive},
         )
 
-        # Ingest each file
-        for file_path in files:
-            try:
-                chunk_ids = ingest_file(str(file_path), metadata=metadata)
-                results[str(file_path)] = chunk_ids
-            except Exception as e:
-                log_event(
-                    "file_ingestion_failed_in_batch",
-                    {"file_path": str(file_path), "error": str(e)},
-                    level="ERROR",
-                )
-                # Continue with other files
-                results[str(file_path)] = []
+        # Ingest files concurrently as the directory walk finds them; the pool
+        # size also bounds the number of files hitting the embedding API at
+        # once, and the in-flight cap keeps the walk from running far ahead
+        max_in_flight = 2 * settings.INGEST_MAX_WORKERS
+        with ThreadPoolExecutor(max_workers=settings.INGEST_MAX_WORKERS) as executor:
+            futures = {}
+
+            def collect(done):
+                for future in done:
+                    file_path, fingerprint = futures.pop(future)
+                    try:
+                        results[file_path] = future.result()
+                        if manifest is not None:
+                            manifest.record(file_path, fingerprint, results[file_path])
+                    except Exception as e:
+                        log_event(
+                            "file_ingestion_failed_in_batch",
+                            {"file_path": file_path, "error": str(e)},
+                            level="ERROR",
+                        )
+                        # Continue with other files
+                        results[file_path] = []
+
+            for file_path in _iter_supported_files(str(directory), recursive):
+                fingerprint = None
+                if manifest is not None:
+                    fingerprint = _file_fingerprint(file_path, metadata)
+                    chunk_ids = None if force else manifest.lookup(file_path, fingerprint)
+                    if chunk_ids is not None:
+                        results[file_path] = chunk_ids
+                        skipped += 1
+                        continue
+
+                if len(futures) >= max_in_flight:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(ingest_file, file_path, metadata=metadata)
+                futures[future] = (file_path, fingerprint)
+
+            collect(wait(futures).done)
 
         log_event(
             "directory_ingestion_completed",
             {
                 "directory": directory_path,
                 "files_processed": len(results),
+                "files_unchanged": skipped,
                 "total_chunks": sum(len(chunks) for chunks in results.values()),
             },
         )
@@ -376,6 +588,10 @@ def ingest_directory(
         )
         raise
 
+    finally:
+        if manifest is not None:
+            manifest.close()
+
 
 # CLI entrypoint
 if __name__ == "__main__":
@@ -1,21 +1,29 @@
 """FastAPI application with /ask and /healthz endpoints."""
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Annotated, Callable, Optional, Dict, Any, List
+import json
 import time
 
 from app.config import settings
 from app.db import get_mongo_client
-from app.rag_engine import get_rag_engine
+from app.rag_engine import RAGEngine, get_rag_engine
 from app.utils import log_event
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Initialize FastAPI app
 app = FastAPI(
     title="mini-lumina",
     description="A minimal RAG system with MongoDB Atlas vector search",
     version="0.1.0",
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
 )
 
 # CORS middleware
@@ -44,6 +52,23 @@ class AskRequest(BaseModel):
     )
 
 
+class BatchAskRequest(BaseModel):
+    """Request model for /ask_batch endpoint."""
+
+    questions: List[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=20, description="User questions"
+    )
+    top_k: Optional[int] = Field(
+        None, ge=1, le=20, description="Number of documents to retrieve per question"
+    )
+    temperature: Optional[float] = Field(
+        0.7, ge=0.0, le=2.0, description="LLM temperature"
+    )
+    filter_criteria: Optional[Dict[str, Any]] = Field(
+        None, description="Optional metadata filters"
+    )
+
+
 class Source(BaseModel):
     """Source document model."""
 
@@ -60,6 +85,13 @@ class AskResponse(BaseModel):
     latency_ms: float
 
 
+class BatchAskResponse(BaseModel):
+    """Response model for /ask_batch endpoint."""
+
+    results: List[AskResponse]
+    latency_ms: float
+
+
 class HealthResponse(BaseModel):
     """Response model for /healthz endpoint."""
 
@@ -83,9 +115,10 @@ async def startup_event():
     except Exception as e:
         log_event("startup_mongodb_error", {"error": str(e)}, level="ERROR")
 
-    # Initialize RAG engine
+    # Initialize RAG engine and open its API connections ahead of the first /ask
     try:
-        get_rag_engine()
+        rag_engine = get_rag_engine()
+        await rag_engine.warm_up()
         log_event("startup_rag_engine_ok")
     except Exception as e:
         log_event("startup_rag_engine_error", {"error": str(e)}, level="ERROR")
@@ -113,6 +146,8 @@ async def root():
         "endpoints": {
             "health": "/healthz",
             "ask": "/ask",
+            "ask_stream": "/ask_stream",
+            "ask_batch": "/ask_batch",
             "docs": "/docs",
         },
     }
@@ -163,13 +198,27 @@ async def health_check():
     return response
 
 
+def rag_engine_dependency() -> Callable[[], RAGEngine]:
+    """
+    Provide a getter for the RAG engine.
+
+    Handlers call it only after the request body has validated, so a bad
+    request gets its 422 without first connecting to MongoDB.
+    """
+    return get_rag_engine
+
+
 @app.post("/ask", response_model=AskResponse)
-async def ask_question(request: AskRequest):
+async def ask_question(
+    request: AskRequest,
+    get_engine: Callable[[], RAGEngine] = Depends(rag_engine_dependency),
+):
     """
     Ask a question and get an answer using RAG.
 
     Args:
         request: Question and retrieval parameters
+        get_engine: RAG engine getter (overridable via app.dependency_overrides)
 
     Returns:
         Answer with source documents and metadata
@@ -184,11 +233,9 @@ async def ask_question(request: AskRequest):
             },
         )
 
-        # Get RAG engine
-        rag_engine = get_rag_engine()
-
         # Execute RAG query
-        result = rag_engine.query(
+        rag_engine = get_engine()
+        result = await rag_engine.aquery(
             question=request.question,
             top_k=request.top_k,
             filter_criteria=request.filter_criteria,
@@ -238,6 +285,130 @@ async def ask_question(request: AskRequest):
         )
 
 
+@app.post("/ask_stream")
+async def ask_question_stream(
+    request: AskRequest,
+    get_engine: Callable[[], RAGEngine] = Depends(rag_engine_dependency),
+):
+    """
+    Ask a question and stream the answer as server-sent events.
+
+    Emits a "sources" event, then one "token" event per answer fragment, then
+    a "done" event with latency_ms. Each event's data is JSON. A failure after
+    the stream has started is reported as an "error" event.
+
+    Args:
+        request: Question and retrieval parameters
+        get_engine: RAG engine getter (overridable via app.dependency_overrides)
+
+    Returns:
+        text/event-stream response
+    """
+    log_event(
+        "ask_stream_request_received",
+        {
+            "question_length": len(request.question),
+            "top_k": request.top_k,
+            "temperature": request.temperature,
+        },
+    )
+
+    try:
+        rag_engine = get_engine()
+    except Exception as e:
+        log_event(
+            "ask_stream_request_failed",
+            {"question": request.question[:100], "error": str(e)},
+            level="ERROR",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process question: {str(e)}",
+        )
+
+    async def events():
+        try:
+            async for event in rag_engine.astream_query(
+                question=request.question,
+                top_k=request.top_k,
+                filter_criteria=request.filter_criteria,
+                temperature=request.temperature,
+            ):
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+        except Exception as e:
+            log_event(
+                "ask_stream_request_failed",
+                {"question": request.question[:100], "error": str(e)},
+                level="ERROR",
+            )
+            detail = json.dumps(f"Failed to process question: {str(e)}")
+            yield f"event: error\ndata: {detail}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/ask_batch", response_model=BatchAskResponse)
+async def ask_batch(
+    request: BatchAskRequest,
+    get_engine: Callable[[], RAGEngine] = Depends(rag_engine_dependency),
+):
+    """
+    Answer several questions in one request.
+
+    Args:
+        request: Questions and shared retrieval parameters
+        get_engine: RAG engine getter (overridable via app.dependency_overrides)
+
+    Returns:
+        One answer per question, in request order
+    """
+    start_time = time.time()
+
+    try:
+        log_event(
+            "ask_batch_request_received",
+            {
+                "num_questions": len(request.questions),
+                "top_k": request.top_k,
+                "temperature": request.temperature,
+            },
+        )
+
+        rag_engine = get_engine()
+        results = await rag_engine.abatch_query(
+            questions=request.questions,
+            top_k=request.top_k,
+            filter_criteria=request.filter_criteria,
+            temperature=request.temperature,
+        )
+
+        response = BatchAskResponse(
+            results=[AskResponse(**result) for result in results],
+            latency_ms=round((time.time() - start_time) * 1000, 2),
+        )
+
+        log_event(
+            "ask_batch_request_completed",
+            {
+                "num_questions": len(request.questions),
+                "latency_ms": response.latency_ms,
+            },
+        )
+
+        return response
+
+    except Exception as e:
+        log_event(
+            "ask_batch_request_failed",
+            {"num_questions": len(request.questions), "error": str(e)},
+            level="ERROR",
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process questions: {str(e)}",
+        )
+
+
 # For development
 if __name__ == "__main__":
     import uvicorn
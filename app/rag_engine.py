@@ -1,47 +1,220 @@
 """RAG engine: retrieval, prompt building, and LLM calling."""
 
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+import asyncio
+import json
+import threading
 import time
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
+import httpx
+import numpy as np
+from openai import (
+    OpenAI,
+    AzureOpenAI,
+    AsyncOpenAI,
+    AsyncAzureOpenAI,
+    RateLimitError,
+    APIError,
+    APITimeoutError,
 )
-from openai import OpenAI, AzureOpenAI, RateLimitError, APIError, Timeout
 
 from app.config import settings
 from app.db import get_mongo_client
 from app.embeddings import get_embedding_client
-from app.utils import log_event, calculate_token_count, truncate_text
+from app.utils import (
+    log_event,
+    calculate_token_count,
+    calculate_token_counts,
+    truncate_text,
+)
+
+
+# Static parts of the RAG prompt, around the context and the question
+_PROMPT_PREFIX = (
+    "You are a helpful AI assistant. Answer the user's question based on the "
+    "provided context documents. If the context doesn't contain enough "
+    "information to answer the question, say so honestly.\n\n"
+    "Context Documents:\n"
+)
+_PROMPT_MIDDLE = "\n\nUser Question: "
+_PROMPT_SUFFIX = "\n\nAnswer:"
+
+
+class AnswerCache:
+    """In-memory cache of RAG answers keyed by question text and similarity."""
+
+    def __init__(self, max_entries: int, threshold: float):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of answers kept (oldest evicted first)
+            threshold: Minimum cosine similarity for a semantic hit
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._exact: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Tuple[str, Dict[str, Any]]] = []
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def params_key(
+        top_k: Optional[int],
+        filter_criteria: Optional[Dict[str, Any]],
+        temperature: float,
+    ) -> str:
+        """Serialize the query parameters an answer depends on."""
+        return json.dumps(
+            [top_k or settings.TOP_K_RESULTS, filter_criteria, temperature],
+            sort_keys=True,
+            default=str,
+        )
+
+    @staticmethod
+    def _normalize_question(question: str) -> str:
+        """Case- and whitespace-fold a question for exact matching."""
+        return " ".join(question.lower().split())
+
+    def get_exact(self, question: str, params: str) -> Optional[Dict[str, Any]]:
+        """Return the answer cached for the same normalized question, if any."""
+        key = (self._normalize_question(question), params)
+        with self._lock:
+            result = self._exact.get(key)
+            if result is not None:
+                self._exact.move_to_end(key)
+            return result
+
+    def get_similar(
+        self, query_embedding: np.ndarray, params: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the answer to the most similar cached question above threshold.
+
+        Args:
+            query_embedding: Unit-length question embedding
+            params: Serialized query parameters (see params_key)
+
+        Returns:
+            Cached result or None on a miss
+        """
+        with self._lock:
+            if self._vectors is None or not self._entries:
+                return None
+            scores = self._vectors[: len(self._entries)] @ query_embedding
+            best, best_score = None, self.threshold
+            for i, (entry_params, result) in enumerate(self._entries):
+                if entry_params == params and scores[i] >= best_score:
+                    best, best_score = result, scores[i]
+            return best
+
+    def put(
+        self,
+        question: str,
+        query_embedding: np.ndarray,
+        params: str,
+        result: Dict[str, Any],
+    ):
+        """Cache a result under both the exact and the semantic layer."""
+        with self._lock:
+            self._exact[(self._normalize_question(question), params)] = result
+            if len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+            if self._vectors is None:
+                self._vectors = np.zeros(
+                    (self.max_entries, len(query_embedding)), dtype=np.float32
+                )
+            # Ring buffer: once full, overwrite the oldest entry
+            if len(self._entries) < self.max_entries:
+                self._entries.append((params, result))
+            else:
+                self._entries[self._next] = (params, result)
+            self._vectors[self._next] = query_embedding
+            self._next = (self._next + 1) % self.max_entries
+
+    def clear(self):
+        """Drop every cached answer."""
+        with self._lock:
+            self._exact.clear()
+            self._vectors = None
+            self._entries = []
+            self._next = 0
 
 
 class RAGEngine:
     """Retrieval-Augmented Generation engine."""
 
     def __init__(self):
-        """Initialize RAG engine with LLM client."""
+        """Initialize RAG engine with sync and async LLM clients."""
+        # Pooled HTTP/2 connections shared by concurrent LLM calls
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        self.http_client = httpx.Client(
+            http2=True, limits=limits, timeout=settings.API_TIMEOUT
+        )
+        self.async_http_client = httpx.AsyncClient(
+            http2=True, limits=limits, timeout=settings.API_TIMEOUT
+        )
+
         if settings.use_azure_openai:
-            self.llm_client = AzureOpenAI(
+            azure_kwargs = dict(
                 api_key=settings.AZURE_OPENAI_API_KEY,
                 api_version=settings.AZURE_OPENAI_API_VERSION,
                 azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
             )
+            self.llm_client = AzureOpenAI(**azure_kwargs, http_client=self.http_client)
+            self.async_llm_client = AsyncAzureOpenAI(
+                **azure_kwargs, http_client=self.async_http_client
+            )
             self.llm_model = settings.AZURE_LLM_DEPLOYMENT
             log_event("rag_engine_initialized", {"provider": "azure_openai"})
         else:
-            self.llm_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.llm_client = OpenAI(
+                api_key=settings.OPENAI_API_KEY, http_client=self.http_client
+            )
+            self.async_llm_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY, http_client=self.async_http_client
+            )
             self.llm_model = settings.LLM_MODEL
             log_event("rag_engine_initialized", {"provider": "openai"})
 
         self.mongo_client = get_mongo_client()
         self.embedding_client = get_embedding_client()
 
+        self.answer_cache: Optional[AnswerCache] = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                settings.ANSWER_CACHE_SIZE, settings.ANSWER_CACHE_THRESHOLD
+            )
+
+    async def warm_up(self) -> None:
+        """
+        Open pooled connections to the LLM and embedding endpoints.
+
+        Any HTTP response will do: the point is to pay the TCP/TLS handshake
+        before the first real request instead of during it.
+        """
+        start_time = time.time()
+        try:
+            await self.async_http_client.get(str(self.async_llm_client.base_url))
+            await asyncio.to_thread(
+                self.embedding_client.http_client.get,
+                str(self.embedding_client.client.base_url),
+            )
+            log_event(
+                "http_clients_warmed",
+                {"latency_ms": round((time.time() - start_time) * 1000, 2)},
+            )
+        except httpx.HTTPError as e:
+            log_event("http_client_warm_up_failed", {"error": str(e)}, level="WARNING")
+
     def retrieve(
         self,
         query: str,
         top_k: int = None,
         filter_criteria: Dict[str, Any] = None,
+        query_embedding: Optional[np.ndarray] = None,
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant documents for a query.
@@ -50,6 +223,7 @@ class RAGEngine:
             query: User query
             top_k: Number of results to retrieve
             filter_criteria: Optional metadata filters
+            query_embedding: Precomputed query embedding, if already available
 
         Returns:
             List of retrieved documents with scores
@@ -58,11 +232,12 @@ class RAGEngine:
 
         try:
             # Generate query embedding
-            query_embedding = self.embedding_client.get_embedding(query)
+            if query_embedding is None:
+                query_embedding = self.embedding_client.get_embedding(query)
 
             # Perform vector search
-            results = self.mongo_client.mongo_knn_search(
-                query_embedding=query_embedding,
+            results = self.retrieve_with_embedding(
+                query_embedding,
                 top_k=top_k,
                 filter_criteria=filter_criteria,
             )
@@ -86,6 +261,62 @@ class RAGEngine:
             )
             raise
 
+    async def aretrieve(
+        self,
+        query: str,
+        top_k: int = None,
+        filter_criteria: Dict[str, Any] = None,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve relevant documents without blocking the event loop.
+
+        The embedding call and vector search use blocking clients, so they run
+        in a worker thread.
+
+        Args:
+            query: User query
+            top_k: Number of results to retrieve
+            filter_criteria: Optional metadata filters
+            query_embedding: Precomputed query embedding, if already available
+
+        Returns:
+            List of retrieved documents with scores
+        """
+        return await asyncio.to_thread(
+            self.retrieve,
+            query=query,
+            top_k=top_k,
+            filter_criteria=filter_criteria,
+            query_embedding=query_embedding,
+        )
+
+    def retrieve_with_embedding(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = None,
+        filter_criteria: Dict[str, Any] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve relevant documents for a precomputed query embedding.
+
+        Args:
+            query_embedding: Query vector embedding
+            top_k: Number of results to retrieve
+            filter_criteria: Optional metadata filters
+            fields: Document fields to return (None for text and metadata)
+
+        Returns:
+            List of retrieved documents with scores
+        """
+        return self.mongo_client.mongo_knn_search(
+            query_embedding=query_embedding,
+            top_k=top_k or settings.TOP_K_RESULTS,
+            filter_criteria=filter_criteria,
+            fields=fields,
+        )
+
     def build_prompt(
         self,
         query: str,
@@ -103,13 +334,20 @@ class RAGEngine:
         Returns:
             Formatted prompt
         """
+        # Chunks ingested with a stored token count skip re-tokenization; the
+        # rest are tokenized together in one batch call
+        token_counts = [doc.get("metadata", {}).get("token_count") for doc in retrieved_docs]
+        missing = [i for i, count in enumerate(token_counts) if count is None]
+        counted = calculate_token_counts([retrieved_docs[i].get("text", "") for i in missing])
+        for i, count in zip(missing, counted):
+            token_counts[i] = count
+
         # Build context from retrieved documents
         context_parts = []
         current_tokens = 0
 
-        for i, doc in enumerate(retrieved_docs, 1):
+        for i, (doc, doc_tokens) in enumerate(zip(retrieved_docs, token_counts), 1):
             doc_text = doc.get("text", "")
-            doc_tokens = calculate_token_count(doc_text)
 
             # Check if adding this document would exceed limit
             if current_tokens + doc_tokens > max_context_tokens:
@@ -126,14 +364,7 @@ class RAGEngine:
         context = "\n\n".join(context_parts)
 
         # Build final prompt
-        prompt = f"""You are a helpful AI assistant. Answer the user's question based on the provided context documents. If the context doesn't contain enough information to answer the question, say so honestly.
-
-Context Documents:
-{context}
-
-User Question: {query}
-
-Answer:"""
+        prompt = "".join([_PROMPT_PREFIX, context, _PROMPT_MIDDLE, query, _PROMPT_SUFFIX])
 
         log_event(
             "prompt_built",
@@ -146,15 +377,23 @@ Answer:"""
 
         return prompt
 
-    @retry(
-        retry=retry_if_exception_type((RateLimitError, APIError, Timeout)),
-        stop=stop_after_attempt(settings.MAX_RETRIES),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-    )
+    def _chat_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """Build the chat messages sent to the LLM for a prompt."""
+        return [
+            {
+                "role": "system",
+                "content": "You are a helpful AI assistant that answers questions based on provided context.",
+            },
+            {"role": "user", "content": prompt},
+        ]
+
     def _call_llm_api(self, prompt: str, temperature: float = 0.7) -> str:
         """
         Call LLM API with retry logic.
 
+        Retries rate-limit, API and timeout errors with exponential backoff
+        (2-10s), up to MAX_RETRIES attempts, then re-raises the last error.
+
         Args:
             prompt: Input prompt
             temperature: Sampling temperature
@@ -162,21 +401,93 @@ Answer:"""
         Returns:
             Generated text
         """
-        response = self.llm_client.chat.completions.create(
-            model=self.llm_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful AI assistant that answers questions based on provided context.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=temperature,
-            max_tokens=1000,
-            timeout=settings.API_TIMEOUT,
+        for attempt in range(settings.MAX_RETRIES):
+            try:
+                response = self.llm_client.chat.completions.create(
+                    model=self.llm_model,
+                    messages=self._chat_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=1000,
+                    timeout=settings.API_TIMEOUT,
+                )
+                return response.choices[0].message.content
+            except (RateLimitError, APIError):
+                if attempt == settings.MAX_RETRIES - 1:
+                    raise
+                time.sleep(min(10, max(2, 2**attempt)))
+
+    async def _acall_llm_api(self, prompt: str, temperature: float = 0.7) -> str:
+        """
+        Call LLM API asynchronously with retry logic.
+
+        Same backoff as _call_llm_api, sleeping without blocking the event loop.
+
+        Args:
+            prompt: Input prompt
+            temperature: Sampling temperature
+
+        Returns:
+            Generated text
+        """
+        for attempt in range(settings.MAX_RETRIES):
+            try:
+                response = await self.async_llm_client.chat.completions.create(
+                    model=self.llm_model,
+                    messages=self._chat_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=1000,
+                    timeout=settings.API_TIMEOUT,
+                )
+                return response.choices[0].message.content
+            except (RateLimitError, APIError):
+                if attempt == settings.MAX_RETRIES - 1:
+                    raise
+                await asyncio.sleep(min(10, max(2, 2**attempt)))
+
+    def _log_llm_completion(
+        self, prompt_tokens: int, response: str, start_time: float
+    ) -> None:
+        """Log token usage and latency for a completed LLM call."""
+        latency_ms = (time.time() - start_time) * 1000
+        response_tokens = calculate_token_count(response, model=self.llm_model)
+
+        log_event(
+            "llm_call_completed",
+            {
+                "prompt_tokens": prompt_tokens,
+                "response_tokens": response_tokens,
+                "total_tokens": prompt_tokens + response_tokens,
+                "latency_ms": round(latency_ms, 2),
+                "model": self.llm_model,
+            },
         )
 
-        return response.choices[0].message.content
+    def _log_llm_error(self, error: Exception) -> None:
+        """Log a failed LLM call under the event matching its error type."""
+        if isinstance(error, RateLimitError):
+            log_event(
+                "llm_rate_limit_exceeded",
+                {"error": str(error), "model": self.llm_model},
+                level="ERROR",
+            )
+        elif isinstance(error, APITimeoutError):
+            log_event(
+                "llm_timeout",
+                {"error": str(error), "timeout": settings.API_TIMEOUT},
+                level="ERROR",
+            )
+        elif isinstance(error, APIError):
+            log_event(
+                "llm_api_error",
+                {"error": str(error), "model": self.llm_model},
+                level="ERROR",
+            )
+        else:
+            log_event(
+                "llm_call_failed",
+                {"error": str(error)},
+                level="ERROR",
+            )
 
     def call_llm(
         self,
@@ -201,55 +512,175 @@ Answer:"""
 
         try:
             response = self._call_llm_api(prompt, temperature)
-            latency_ms = (time.time() - start_time) * 1000
-            response_tokens = calculate_token_count(response, model=self.llm_model)
+            self._log_llm_completion(prompt_tokens, response, start_time)
+            return response
 
-            log_event(
-                "llm_call_completed",
-                {
-                    "prompt_tokens": prompt_tokens,
-                    "response_tokens": response_tokens,
-                    "total_tokens": prompt_tokens + response_tokens,
-                    "latency_ms": round(latency_ms, 2),
-                    "model": self.llm_model,
-                },
-            )
+        except Exception as e:
+            self._log_llm_error(e)
+            raise
+
+    async def acall_llm(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+    ) -> str:
+        """
+        Call LLM asynchronously with error handling and logging.
 
+        Args:
+            prompt: Input prompt
+            temperature: Sampling temperature
+
+        Returns:
+            Generated text
+
+        Raises:
+            Exception: If LLM call fails after retries
+        """
+        start_time = time.time()
+        prompt_tokens = calculate_token_count(prompt, model=self.llm_model)
+
+        try:
+            response = await self._acall_llm_api(prompt, temperature)
+            self._log_llm_completion(prompt_tokens, response, start_time)
             return response
 
-        except RateLimitError as e:
-            log_event(
-                "llm_rate_limit_exceeded",
-                {"error": str(e), "model": self.llm_model},
-                level="ERROR",
-            )
+        except Exception as e:
+            self._log_llm_error(e)
             raise
 
-        except Timeout as e:
-            log_event(
-                "llm_timeout",
-                {"error": str(e), "timeout": settings.API_TIMEOUT},
-                level="ERROR",
-            )
-            raise
+    def _no_results_response(self, question: str, start_time: float) -> Dict[str, Any]:
+        """Build the fallback response used when nothing was retrieved."""
+        log_event(
+            "no_documents_retrieved",
+            {"question": question[:100]},
+            level="WARNING",
+        )
+        return {
+            "answer": "I couldn't find any relevant information to answer your question.",
+            "sources": [],
+            "latency_ms": round((time.time() - start_time) * 1000, 2),
+        }
+
+    def _cached_response(
+        self, question: str, cached: Dict[str, Any], start_time: float
+    ) -> Dict[str, Any]:
+        """Build the response for an answer served from the answer cache."""
+        latency_ms = (time.time() - start_time) * 1000
+        log_event(
+            "rag_query_cache_hit",
+            {"question_length": len(question), "latency_ms": round(latency_ms, 2)},
+        )
+        return {**cached, "latency_ms": round(latency_ms, 2)}
 
-        except APIError as e:
-            log_event(
-                "llm_api_error",
-                {"error": str(e), "model": self.llm_model},
-                level="ERROR",
+    @staticmethod
+    def _format_sources(retrieved_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Reduce retrieved documents to the source fields returned to clients."""
+        return [
+            {
+                "text": doc.get("text", ""),
+                "score": doc.get("score", 0.0),
+                "metadata": doc.get("metadata", {}),
+            }
+            for doc in retrieved_docs
+        ]
+
+    def _format_result(
+        self,
+        question: str,
+        retrieved_docs: List[Dict[str, Any]],
+        answer: str,
+        start_time: float,
+    ) -> Dict[str, Any]:
+        """Assemble and log the final RAG response."""
+        latency_ms = (time.time() - start_time) * 1000
+
+        sources = self._format_sources(retrieved_docs)
+
+        result = {
+            "answer": answer,
+            "sources": sources,
+            "latency_ms": round(latency_ms, 2),
+        }
+
+        log_event(
+            "rag_query_completed",
+            {
+                "question_length": len(question),
+                "num_sources": len(sources),
+                "answer_length": len(answer),
+                "latency_ms": round(latency_ms, 2),
+            },
+        )
+
+        return result
+
+    def query(
+        self,
+        question: str,
+        top_k: int = None,
+        filter_criteria: Dict[str, Any] = None,
+        temperature: float = 0.7,
+    ) -> Dict[str, Any]:
+        """
+        Execute full RAG pipeline: retrieve, build prompt, and generate answer.
+
+        Args:
+            question: User question
+            top_k: Number of documents to retrieve
+            filter_criteria: Optional metadata filters
+            temperature: LLM sampling temperature
+
+        Returns:
+            Dictionary with answer, sources, and metadata
+        """
+        start_time = time.time()
+
+        try:
+            log_event("rag_query_started", {"question": question[:100]})
+
+            # Serve repeated and near-duplicate questions from the answer cache
+            query_embedding = None
+            if self.answer_cache is not None:
+                params = AnswerCache.params_key(top_k, filter_criteria, temperature)
+                cached = self.answer_cache.get_exact(question, params)
+                if cached is None:
+                    query_embedding = self.embedding_client.get_embedding(question)
+                    cached = self.answer_cache.get_similar(query_embedding, params)
+                if cached is not None:
+                    return self._cached_response(question, cached, start_time)
+
+            # Retrieve relevant documents
+            retrieved_docs = self.retrieve(
+                query=question,
+                top_k=top_k,
+                filter_criteria=filter_criteria,
+                query_embedding=query_embedding,
             )
-            raise
+
+            if not retrieved_docs:
+                return self._no_results_response(question, start_time)
+
+            # Build prompt
+            prompt = self.build_prompt(question, retrieved_docs)
+
+            # Generate answer
+            answer = self.call_llm(prompt, temperature=temperature)
+
+            result = self._format_result(question, retrieved_docs, answer, start_time)
+            if self.answer_cache is not None:
+                self.answer_cache.put(question, query_embedding, params, result)
+            return result
 
         except Exception as e:
             log_event(
-                "llm_call_failed",
-                {"error": str(e)},
+                "rag_query_failed",
+                {"question": question[:100], "error": str(e)},
                 level="ERROR",
             )
             raise
 
-    def query(
+    async def aquery(
         self,
         question: str,
         top_k: int = None,
@@ -257,7 +688,10 @@ Answer:"""
         temperature: float = 0.7,
     ) -> Dict[str, Any]:
         """
-        Execute full RAG pipeline: retrieve, build prompt, and generate answer.
+        Execute the RAG pipeline without blocking the event loop.
+
+        Same contract as query(): retrieval runs in a worker thread and the
+        LLM call goes through the async client.
 
         Args:
             question: User question
@@ -273,62 +707,121 @@ Answer:"""
         try:
             log_event("rag_query_started", {"question": question[:100]})
 
+            # Serve repeated and near-duplicate questions from the answer cache
+            query_embedding = None
+            if self.answer_cache is not None:
+                params = AnswerCache.params_key(top_k, filter_criteria, temperature)
+                cached = self.answer_cache.get_exact(question, params)
+                if cached is None:
+                    query_embedding = await asyncio.to_thread(
+                        self.embedding_client.get_embedding, question
+                    )
+                    cached = self.answer_cache.get_similar(query_embedding, params)
+                if cached is not None:
+                    return self._cached_response(question, cached, start_time)
+
             # Retrieve relevant documents
-            retrieved_docs = self.retrieve(
+            retrieved_docs = await self.aretrieve(
                 query=question,
                 top_k=top_k,
                 filter_criteria=filter_criteria,
+                query_embedding=query_embedding,
             )
 
             if not retrieved_docs:
-                log_event(
-                    "no_documents_retrieved",
-                    {"question": question[:100]},
-                    level="WARNING",
-                )
-                return {
-                    "answer": "I couldn't find any relevant information to answer your question.",
-                    "sources": [],
-                    "latency_ms": round((time.time() - start_time) * 1000, 2),
-                }
+                return self._no_results_response(question, start_time)
 
             # Build prompt
             prompt = self.build_prompt(question, retrieved_docs)
 
             # Generate answer
-            answer = self.call_llm(prompt, temperature=temperature)
-
-            latency_ms = (time.time() - start_time) * 1000
+            answer = await self.acall_llm(prompt, temperature=temperature)
 
-            # Format sources
-            sources = [
-                {
-                    "text": doc.get("text", ""),
-                    "score": doc.get("score", 0.0),
-                    "metadata": doc.get("metadata", {}),
-                }
-                for doc in retrieved_docs
-            ]
-
-            result = {
-                "answer": answer,
-                "sources": sources,
-                "latency_ms": round(latency_ms, 2),
-            }
+            result = self._format_result(question, retrieved_docs, answer, start_time)
+            if self.answer_cache is not None:
+                self.answer_cache.put(question, query_embedding, params, result)
+            return result
 
+        except Exception as e:
             log_event(
-                "rag_query_completed",
-                {
-                    "question_length": len(question),
-                    "num_sources": len(sources),
-                    "answer_length": len(answer),
-                    "latency_ms": round(latency_ms, 2),
-                },
+                "rag_query_failed",
+                {"question": question[:100], "error": str(e)},
+                level="ERROR",
             )
+            raise
 
-            return result
+    async def astream_query(
+        self,
+        question: str,
+        top_k: int = None,
+        filter_criteria: Dict[str, Any] = None,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Execute the RAG pipeline, streaming the answer as it is generated.
+
+        Yields events as dicts with "event" and "data" keys: one "sources"
+        event (the retrieved sources), then "token" events (answer text
+        fragments), then a "done" event carrying latency_ms.
+
+        Args:
+            question: User question
+            top_k: Number of documents to retrieve
+            filter_criteria: Optional metadata filters
+            temperature: LLM sampling temperature
+
+        Yields:
+            Stream events, in order
+        """
+        start_time = time.time()
+
+        try:
+            log_event("rag_stream_query_started", {"question": question[:100]})
+
+            retrieved_docs = await self.aretrieve(
+                query=question,
+                top_k=top_k,
+                filter_criteria=filter_criteria,
+            )
+
+            if not retrieved_docs:
+                result = self._no_results_response(question, start_time)
+                yield {"event": "sources", "data": []}
+                yield {"event": "token", "data": result["answer"]}
+                yield {"event": "done", "data": {"latency_ms": result["latency_ms"]}}
+                return
+
+            yield {"event": "sources", "data": self._format_sources(retrieved_docs)}
+
+            prompt = self.build_prompt(question, retrieved_docs)
+            prompt_tokens = calculate_token_count(prompt, model=self.llm_model)
+            llm_start_time = time.time()
+
+            stream = await self.async_llm_client.chat.completions.create(
+                model=self.llm_model,
+                messages=self._chat_messages(prompt),
+                temperature=temperature,
+                max_tokens=1000,
+                timeout=settings.API_TIMEOUT,
+                stream=True,
+            )
+
+            parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield {"event": "token", "data": delta}
+
+            self._log_llm_completion(prompt_tokens, "".join(parts), llm_start_time)
+            result = self._format_result(question, retrieved_docs, "".join(parts), start_time)
+            yield {"event": "done", "data": {"latency_ms": result["latency_ms"]}}
 
         except Exception as e:
+            if isinstance(e, APIError):
+                self._log_llm_error(e)
             log_event(
                 "rag_query_failed",
                 {"question": question[:100], "error": str(e)},
@@ -336,6 +829,70 @@ Answer:"""
             )
             raise
 
+    async def abatch_query(
+        self,
+        questions: List[str],
+        top_k: int = None,
+        filter_criteria: Dict[str, Any] = None,
+        temperature: float = 0.7,
+    ) -> List[Dict[str, Any]]:
+        """
+        Execute the RAG pipeline for several questions at once.
+
+        All questions are embedded in one batched API call; the vector
+        searches and LLM calls then run concurrently.
+
+        Args:
+            questions: User questions
+            top_k: Number of documents to retrieve per question
+            filter_criteria: Optional metadata filters (applied to every question)
+            temperature: LLM sampling temperature
+
+        Returns:
+            One result per question, in order (same shape as query())
+        """
+        start_time = time.time()
+
+        try:
+            log_event("rag_batch_query_started", {"num_questions": len(questions)})
+
+            query_embeddings = await asyncio.to_thread(
+                self.embedding_client.get_embeddings_batch, questions
+            )
+
+            retrieved = await asyncio.gather(
+                *(
+                    self.aretrieve(
+                        query=question,
+                        top_k=top_k,
+                        filter_criteria=filter_criteria,
+                        query_embedding=query_embedding,
+                    )
+                    for question, query_embedding in zip(questions, query_embeddings)
+                )
+            )
+
+            async def answer_one(question: str, retrieved_docs: List[Dict[str, Any]]):
+                if not retrieved_docs:
+                    return self._no_results_response(question, start_time)
+                prompt = self.build_prompt(question, retrieved_docs)
+                answer = await self.acall_llm(prompt, temperature=temperature)
+                return self._format_result(question, retrieved_docs, answer, start_time)
+
+            return list(
+                await asyncio.gather(
+                    *(answer_one(q, docs) for q, docs in zip(questions, retrieved))
+                )
+            )
+
+        except Exception as e:
+            log_event(
+                "rag_batch_query_failed",
+                {"num_questions": len(questions), "error": str(e)},
+                level="ERROR",
+            )
+            raise
+
 
 # Global RAG engine instance
 _rag_engine: Optional[RAGEngine] = None
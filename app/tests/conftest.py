@@ -4,6 +4,15 @@ import pytest
 from unittest.mock import Mock, MagicMock
 
 
+@pytest.fixture(scope="session")
+def client():
+    """Create test client, shared by all tests (the handlers hold no state)."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
 @pytest.fixture
 def mock_embedding():
     """Mock embedding vector."""
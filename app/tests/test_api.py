@@ -1,16 +1,11 @@
 """Tests for FastAPI endpoints."""
 
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock
 
-from app.main import app
+from app.main import app, rag_engine_dependency
 
-
-@pytest.fixture
-def client():
-    """Create test client."""
-    return TestClient(app)
+_LONG_QUESTION = "What is AI? " * 500
 
 
 @pytest.fixture
@@ -34,6 +29,16 @@ def mock_rag_result():
     }
 
 
+@pytest.fixture
+def mock_engine(mock_rag_result):
+    """Override the /ask RAG engine dependency with a mock."""
+    engine = Mock()
+    engine.aquery = AsyncMock(return_value=mock_rag_result)
+    app.dependency_overrides[rag_engine_dependency] = lambda: lambda: engine
+    yield engine
+    app.dependency_overrides.clear()
+
+
 def test_root_endpoint(client):
     """Test root endpoint."""
     response = client.get("/")
@@ -47,210 +52,200 @@ def test_root_endpoint(client):
     assert "endpoints" in data
 
 
-def test_healthz_healthy(client):
+def test_healthz_healthy(client, monkeypatch):
     """Test health check when healthy."""
-    with patch("app.main.get_mongo_client") as mock_get_client:
-        mock_client = Mock()
-        mock_client.health_check.return_value = True
-        mock_get_client.return_value = mock_client
+    mock_client = Mock()
+    mock_client.health_check.return_value = True
+    monkeypatch.setattr("app.main.get_mongo_client", lambda: mock_client)
 
-        response = client.get("/healthz")
+    response = client.get("/healthz")
 
-        assert response.status_code == 200
-        data = response.json()
+    assert response.status_code == 200
+    data = response.json()
 
-        assert data["status"] == "healthy"
-        assert data["mongodb"] == "healthy"
-        assert "timestamp" in data
+    assert data["status"] == "healthy"
+    assert data["mongodb"] == "healthy"
+    assert "timestamp" in data
 
 
-def test_healthz_unhealthy(client):
+def test_healthz_unhealthy(client, monkeypatch):
     """Test health check when unhealthy."""
-    with patch("app.main.get_mongo_client") as mock_get_client:
-        mock_client = Mock()
-        mock_client.health_check.return_value = False
-        mock_get_client.return_value = mock_client
+    mock_client = Mock()
+    mock_client.health_check.return_value = False
+    monkeypatch.setattr("app.main.get_mongo_client", lambda: mock_client)
 
-        response = client.get("/healthz")
+    response = client.get("/healthz")
 
-        assert response.status_code == 503
-        data = response.json()
+    assert response.status_code == 503
+    data = response.json()
 
-        assert "status" in data["detail"]
+    assert "status" in data["detail"]
 
 
-def test_ask_endpoint_success(client, mock_rag_result):
+def test_ask_endpoint_success(client, mock_engine, mock_rag_result):
     """Test /ask endpoint with successful query."""
-    with patch("app.main.get_rag_engine") as mock_get_engine:
-        mock_engine = Mock()
-        mock_engine.query.return_value = mock_rag_result
-        mock_get_engine.return_value = mock_engine
-
-        request_data = {
-            "question": "What is machine learning?",
-            "top_k": 5,
-            "temperature": 0.7,
-        }
-
-        response = client.post("/ask", json=request_data)
-
-        assert response.status_code == 200
-        data = response.json()
-
-        # Check response structure
-        assert "answer" in data
-        assert "sources" in data
-        assert "latency_ms" in data
+    request_data = {
+        "question": "What is machine learning?",
+        "top_k": 5,
+        "temperature": 0.7,
+    }
 
-        # Check answer
-        assert data["answer"] == mock_rag_result["answer"]
+    response = client.post("/ask", json=request_data)
 
-        # Check sources
-        assert len(data["sources"]) == 2
-        assert data["sources"][0]["text"] == mock_rag_result["sources"][0]["text"]
-        assert data["sources"][0]["score"] == mock_rag_result["sources"][0]["score"]
+    assert response.status_code == 200
+    data = response.json()
 
-        # Verify RAG engine was called with correct params
-        mock_engine.query.assert_called_once_with(
-            question=request_data["question"],
-            top_k=request_data["top_k"],
-            filter_criteria=None,
-            temperature=request_data["temperature"],
-        )
+    # Check response structure
+    assert "answer" in data
+    assert "sources" in data
+    assert "latency_ms" in data
+
+    # Check answer
+    assert data["answer"] == mock_rag_result["answer"]
+
+    # Check sources
+    assert len(data["sources"]) == 2
+    assert data["sources"][0]["text"] == mock_rag_result["sources"][0]["text"]
+    assert data["sources"][0]["score"] == mock_rag_result["sources"][0]["score"]
+
+    # Verify RAG engine was called with correct params
+    mock_engine.aquery.assert_awaited_once_with(
+        question=request_data["question"],
+        top_k=request_data["top_k"],
+        filter_criteria=None,
+        temperature=request_data["temperature"],
+    )
 
 
-def test_ask_endpoint_minimal_request(client, mock_rag_result):
+def test_ask_endpoint_minimal_request(client, mock_engine):
     """Test /ask endpoint with minimal request (only question)."""
-    with patch("app.main.get_rag_engine") as mock_get_engine:
-        mock_engine = Mock()
-        mock_engine.query.return_value = mock_rag_result
-        mock_get_engine.return_value = mock_engine
-
-        request_data = {"question": "What is AI?"}
+    request_data = {"question": "What is AI?"}
 
-        response = client.post("/ask", json=request_data)
+    response = client.post("/ask", json=request_data)
 
-        assert response.status_code == 200
-        data = response.json()
+    assert response.status_code == 200
+    data = response.json()
 
-        assert "answer" in data
-        assert "sources" in data
+    assert "answer" in data
+    assert "sources" in data
 
 
-def test_ask_endpoint_with_filters(client, mock_rag_result):
+def test_ask_endpoint_with_filters(client, mock_engine):
     """Test /ask endpoint with metadata filters."""
-    with patch("app.main.get_rag_engine") as mock_get_engine:
-        mock_engine = Mock()
-        mock_engine.query.return_value = mock_rag_result
-        mock_get_engine.return_value = mock_engine
+    request_data = {
+        "question": "What is AI?",
+        "top_k": 3,
+        "filter_criteria": {"metadata.source": "ai_intro.txt"},
+    }
 
-        request_data = {
-            "question": "What is AI?",
-            "top_k": 3,
-            "filter_criteria": {"metadata.source": "ai_intro.txt"},
-        }
+    response = client.post("/ask", json=request_data)
 
-        response = client.post("/ask", json=request_data)
+    assert response.status_code == 200
 
-        assert response.status_code == 200
+    # Verify filters were passed
+    call_args = mock_engine.aquery.call_args
+    assert call_args.kwargs["filter_criteria"] == request_data["filter_criteria"]
 
-        # Verify filters were passed
-        call_args = mock_engine.query.call_args
-        assert call_args.kwargs["filter_criteria"] == request_data["filter_criteria"]
 
+def test_ask_stream_endpoint(client, mock_engine):
+    """Test /ask_stream emits sources, tokens and done as server-sent events."""
 
-def test_ask_endpoint_empty_question(client):
-    """Test /ask endpoint with empty question."""
-    request_data = {"question": ""}
+    async def events(**kwargs):
+        yield {"event": "sources", "data": []}
+        yield {"event": "token", "data": "Hello"}
+        yield {"event": "token", "data": " world"}
+        yield {"event": "done", "data": {"latency_ms": 12.5}}
 
-    response = client.post("/ask", json=request_data)
+    mock_engine.astream_query = events
 
-    # Should fail validation
-    assert response.status_code == 422  # Unprocessable Entity
+    response = client.post("/ask_stream", json={"question": "What is AI?"})
 
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        "event: sources\ndata: []\n\n"
+        'event: token\ndata: "Hello"\n\n'
+        'event: token\ndata: " world"\n\n'
+        'event: done\ndata: {"latency_ms": 12.5}\n\n'
+    )
 
-def test_ask_endpoint_missing_question(client):
-    """Test /ask endpoint without question field."""
-    request_data = {"top_k": 5}
 
-    response = client.post("/ask", json=request_data)
+def test_ask_batch_endpoint(client, mock_engine, mock_rag_result):
+    """Test /ask_batch answers every question in order."""
+    mock_engine.abatch_query = AsyncMock(return_value=[mock_rag_result] * 2)
 
-    # Should fail validation
-    assert response.status_code == 422
+    request_data = {"questions": ["What is AI?", "What is ML?"], "top_k": 3}
 
+    response = client.post("/ask_batch", json=request_data)
 
-def test_ask_endpoint_invalid_top_k(client):
-    """Test /ask endpoint with invalid top_k values."""
-    # top_k too small
-    response = client.post("/ask", json={"question": "Test?", "top_k": 0})
-    assert response.status_code == 422
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["results"]) == 2
+    assert data["results"][0]["answer"] == mock_rag_result["answer"]
+    mock_engine.abatch_query.assert_awaited_once_with(
+        questions=request_data["questions"],
+        top_k=3,
+        filter_criteria=None,
+        temperature=0.7,
+    )
 
-    # top_k too large
-    response = client.post("/ask", json={"question": "Test?", "top_k": 100})
-    assert response.status_code == 422
 
+def test_ask_batch_endpoint_validation(client):
+    """Test /ask_batch rejects empty batches and empty questions."""
+    assert client.post("/ask_batch", json={"questions": []}).status_code == 422
+    assert client.post("/ask_batch", json={"questions": ["ok", ""]}).status_code == 422
 
-def test_ask_endpoint_invalid_temperature(client):
-    """Test /ask endpoint with invalid temperature values."""
-    # temperature too small
-    response = client.post(
-        "/ask", json={"question": "Test?", "temperature": -0.1}
-    )
-    assert response.status_code == 422
 
-    # temperature too large
-    response = client.post(
-        "/ask", json={"question": "Test?", "temperature": 2.5}
-    )
+@pytest.mark.parametrize(
+    "payload",
+    [
+        pytest.param({"question": ""}, id="empty_question"),
+        pytest.param({"top_k": 5}, id="missing_question"),
+        pytest.param({"question": "Test?", "top_k": 0}, id="top_k_too_small"),
+        pytest.param({"question": "Test?", "top_k": 100}, id="top_k_too_large"),
+        pytest.param({"question": "Test?", "temperature": -0.1}, id="temperature_too_small"),
+        pytest.param({"question": "Test?", "temperature": 2.5}, id="temperature_too_large"),
+    ],
+)
+def test_ask_endpoint_validation(client, payload):
+    """Test /ask rejects invalid requests with 422 Unprocessable Entity."""
+    response = client.post("/ask", json=payload)
+
     assert response.status_code == 422
 
 
-def test_ask_endpoint_error_handling(client):
+def test_ask_endpoint_error_handling(client, mock_engine):
     """Test /ask endpoint error handling."""
-    with patch("app.main.get_rag_engine") as mock_get_engine:
-        mock_engine = Mock()
-        mock_engine.query.side_effect = Exception("Database connection failed")
-        mock_get_engine.return_value = mock_engine
+    mock_engine.aquery.side_effect = Exception("Database connection failed")
 
-        request_data = {"question": "What is AI?"}
+    request_data = {"question": "What is AI?"}
 
-        response = client.post("/ask", json=request_data)
+    response = client.post("/ask", json=request_data)
 
-        assert response.status_code == 500
-        assert "error" in response.text.lower() or "failed" in response.text.lower()
+    assert response.status_code == 500
+    assert "error" in response.text.lower() or "failed" in response.text.lower()
 
 
-def test_ask_endpoint_long_question(client, mock_rag_result):
+@pytest.mark.slow
+def test_ask_endpoint_long_question(client, mock_engine):
     """Test /ask endpoint with very long question."""
-    with patch("app.main.get_rag_engine") as mock_get_engine:
-        mock_engine = Mock()
-        mock_engine.query.return_value = mock_rag_result
-        mock_get_engine.return_value = mock_engine
+    request_data = {"question": _LONG_QUESTION}
 
-        long_question = "What is AI? " * 500  # Very long question
-
-        request_data = {"question": long_question}
-
-        response = client.post("/ask", json=request_data)
+    response = client.post("/ask", json=request_data)
 
-        # Should still work
-        assert response.status_code == 200
+    # Should still work
+    assert response.status_code == 200
 
 
-def test_ask_endpoint_special_characters(client, mock_rag_result):
+def test_ask_endpoint_special_characters(client, mock_engine):
     """Test /ask endpoint with special characters in question."""
-    with patch("app.main.get_rag_engine") as mock_get_engine:
-        mock_engine = Mock()
-        mock_engine.query.return_value = mock_rag_result
-        mock_get_engine.return_value = mock_engine
-
-        request_data = {
-            "question": "What is AI? 🤖 Can it understand émojis & spëcial chars?"
-        }
+    request_data = {
+        "question": "What is AI? 🤖 Can it understand émojis & spëcial chars?"
+    }
 
-        response = client.post("/ask", json=request_data)
+    response = client.post("/ask", json=request_data)
 
-        assert response.status_code == 200
+    assert response.status_code == 200
 
 
 def test_cors_headers(client):
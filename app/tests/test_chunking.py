@@ -1,13 +1,26 @@
 """Tests for text chunking functionality."""
 
+import os
+import time
+
 import pytest
-from app.ingestion import chunk_text, generate_chunk_id
+from unittest.mock import Mock
+from app.utils import calculate_token_count, truncate_text
+from app.ingestion import (
+    IngestManifest,
+    _iter_supported_files,
+    chunk_text,
+    iter_chunks,
+    generate_chunk_id,
+    ingest_directory,
+)
+
+_SENTENCES = "This is a test sentence. " * 100
 
 
 def test_chunk_text_basic():
     """Test basic text chunking."""
-    text = "This is a test sentence. " * 100  # Long text
-    chunks = chunk_text(text, max_chunk_size=100, overlap=10)
+    chunks = chunk_text(_SENTENCES, max_chunk_size=100, overlap=10)
 
     assert len(chunks) > 1
     assert all(len(chunk) <= 110 for chunk in chunks)  # Allow some variance
@@ -64,6 +77,37 @@ def test_chunk_text_sentence_boundary():
         assert chunk.rstrip().endswith(".") or chunk.rstrip().endswith("!")
 
 
+def test_chunk_text_last_sentence_boundary():
+    """Test chunks break at the last of several . ! ? boundaries in the window."""
+    text = "One! Two? Three. Four five six seven eight nine ten."
+    chunks = chunk_text(text, max_chunk_size=20, overlap=1)
+
+    assert chunks[0] == "One! Two? Three."
+
+
+@pytest.mark.slow
+def test_chunk_text_large():
+    """Test chunking a 1MB document stays fast and within the size limit."""
+    text = ("Sentence one is here. Another clause, with words! Is it? " * 20000)[:1_000_000]
+
+    start = time.perf_counter()
+    chunks = chunk_text(text, max_chunk_size=512, overlap=50)
+    elapsed = time.perf_counter() - start
+
+    assert len(chunks) > 1000
+    assert all(len(chunk) <= 512 for chunk in chunks)
+    # ~30ms without instrumentation; generous headroom for coverage tracing
+    assert elapsed < 0.5
+
+
+def test_iter_chunks_matches_chunk_text():
+    """Test the lazy chunker yields the same chunks as chunk_text."""
+    chunks = iter_chunks(_SENTENCES, max_chunk_size=100, overlap=10)
+
+    assert not isinstance(chunks, list)
+    assert list(chunks) == chunk_text(_SENTENCES, max_chunk_size=100, overlap=10)
+
+
 def test_chunk_text_whitespace_normalization():
     """Test that whitespace is normalized."""
     text = "This   has    irregular     spacing\n\n\nand newlines."
@@ -86,11 +130,25 @@ def test_generate_chunk_id():
     # Different chunks should have different IDs
     assert id1 != id2
 
-    # IDs should be valid MD5 hashes (32 hex chars)
+    # IDs should be 128-bit hex IDs (32 hex chars)
     assert len(id1) == 32
     assert all(c in "0123456789abcdef" for c in id1)
 
 
+def test_generate_chunk_id_blake2b(monkeypatch):
+    """Test blake2b chunk IDs keep the MD5 ID shape."""
+    from app.config import settings
+
+    md5_id = generate_chunk_id("test.txt", 0)
+    monkeypatch.setattr(settings, "CHUNK_ID_HASH", "blake2b")
+    blake_id = generate_chunk_id("test.txt", 0)
+
+    assert blake_id != md5_id
+    assert blake_id == generate_chunk_id("test.txt", 0)
+    assert len(blake_id) == 32
+    assert all(c in "0123456789abcdef" for c in blake_id)
+
+
 def test_generate_chunk_id_different_files():
     """Test chunk IDs for different files."""
     id1 = generate_chunk_id("file1.txt", 0)
@@ -124,3 +182,86 @@ def test_chunk_text_special_characters():
     combined = " ".join(chunks)
     assert "@" in combined
     assert "café" in combined
+
+
+def test_truncate_text_long_input():
+    """Test truncating a very long input stays within the token limit."""
+    text = "The quick brown fox jumps over the lazy dog. " * 2300  # ~100k chars
+    truncated = truncate_text(text, max_tokens=200)
+
+    assert text.startswith(truncated)
+    assert 0 < calculate_token_count(truncated) <= 200
+
+
+def test_ingest_manifest_lookup(tmp_path):
+    """Test the manifest returns stored chunk IDs only for a matching fingerprint."""
+    manifest = IngestManifest(str(tmp_path / "manifest.sqlite"))
+    manifest.record("docs/a.txt", "fp1", ["id_0", "id_1"])
+
+    assert manifest.lookup("docs/a.txt", "fp1") == ["id_0", "id_1"]
+    assert manifest.lookup("docs/a.txt", "fp2") is None
+    assert manifest.lookup("docs/b.txt", "fp1") is None
+    manifest.close()
+
+
+def test_iter_supported_files_skips_symlinked_dirs(tmp_path):
+    """Test directory walking does not follow symlinked directories."""
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "a.txt").write_text("a")
+    (tmp_path / "docs" / "b.bin").write_text("b")
+    (tmp_path / "docs" / "loop").symlink_to(tmp_path, target_is_directory=True)
+    (tmp_path / "alias").symlink_to(tmp_path / "docs", target_is_directory=True)
+
+    files = list(_iter_supported_files(str(tmp_path), recursive=True))
+
+    assert files == [str(tmp_path / "docs" / "a.txt")]
+
+
+@pytest.mark.skipif(
+    hasattr(os, "geteuid") and os.geteuid() == 0,
+    reason="root can read directories regardless of permissions",
+)
+def test_iter_supported_files_skips_unreadable_dirs(tmp_path):
+    """Test directory walking skips subdirectories it cannot read."""
+    (tmp_path / "a.txt").write_text("a")
+    locked = tmp_path / "locked"
+    locked.mkdir()
+    (locked / "b.txt").write_text("b")
+    locked.chmod(0o000)
+    try:
+        files = list(_iter_supported_files(str(tmp_path), recursive=True))
+    finally:
+        locked.chmod(0o755)
+
+    assert files == [str(tmp_path / "a.txt")]
+
+
+def test_ingest_directory_builds_clients_once(monkeypatch, tmp_path, mock_embedding):
+    """Test concurrent ingest workers share one Mongo and one embedding client."""
+    for i in range(8):
+        (tmp_path / f"doc_{i}.txt").write_text(f"Document {i}. " * 20)
+
+    def slow_constructor(instance):
+        def build():
+            time.sleep(0.05)  # widen the cold-start race window
+            return instance
+
+        return Mock(side_effect=build)
+
+    embedding_client = Mock()
+    embedding_client.get_embeddings_batch.side_effect = lambda texts: [
+        mock_embedding
+    ] * len(texts)
+    mongo_cls = slow_constructor(Mock())
+    embedding_cls = slow_constructor(embedding_client)
+    monkeypatch.setattr("app.db._mongo_client", None)
+    monkeypatch.setattr("app.db.MongoDBClient", mongo_cls)
+    monkeypatch.setattr("app.embeddings._embedding_client", None)
+    monkeypatch.setattr("app.embeddings.EmbeddingClient", embedding_cls)
+
+    results = ingest_directory(str(tmp_path))
+
+    assert len(results) == 8
+    assert all(results.values())
+    mongo_cls.assert_called_once()
+    embedding_cls.assert_called_once()
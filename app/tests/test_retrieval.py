@@ -1,24 +1,56 @@
 """Tests for retrieval functionality."""
 
+import httpx
+import numpy as np
 import pytest
-from unittest.mock import Mock, patch
-from app.rag_engine import RAGEngine
+from unittest.mock import AsyncMock, Mock, patch
+from bson.binary import Binary, BinaryVectorDtype
+from openai import RateLimitError
+from pymongo.errors import BulkWriteError
+from app.db import (
+    BinaryCodeIndex,
+    LocalNumpyIndex,
+    MongoDBClient,
+    pack_binary_code,
+    pack_embedding,
+    VECTOR_SUBTYPE,
+)
+from app.rag_engine import AnswerCache, RAGEngine
+
+_LONG_DOC = "This is a very long document. " * 1000
+
+
+@pytest.fixture(autouse=True)
+def _patch_rag_deps(
+    monkeypatch, mock_mongo_client, mock_embedding_client, mock_llm_client
+):
+    """Point every RAGEngine built in this module at the mocked clients."""
+    monkeypatch.setattr("app.rag_engine.get_mongo_client", lambda: mock_mongo_client)
+    monkeypatch.setattr(
+        "app.rag_engine.get_embedding_client", lambda: mock_embedding_client
+    )
+    monkeypatch.setattr("app.rag_engine.OpenAI", lambda **kwargs: mock_llm_client)
+    monkeypatch.setattr("app.rag_engine.AzureOpenAI", lambda **kwargs: mock_llm_client)
 
 
 @pytest.fixture
-def rag_engine_with_mocks(mock_mongo_client, mock_embedding_client, mock_llm_client):
+def rag_engine_with_mocks(mock_llm_client):
     """Create RAG engine with mocked dependencies."""
-    with patch("app.rag_engine.get_mongo_client", return_value=mock_mongo_client):
-        with patch(
-            "app.rag_engine.get_embedding_client", return_value=mock_embedding_client
-        ):
-            with patch("app.rag_engine.OpenAI", return_value=mock_llm_client):
-                with patch("app.rag_engine.AzureOpenAI", return_value=mock_llm_client):
-                    engine = RAGEngine()
-                    engine.mongo_client = mock_mongo_client
-                    engine.embedding_client = mock_embedding_client
-                    engine.llm_client = mock_llm_client
-                    return engine
+    engine = RAGEngine()
+    engine.async_llm_client = Mock()
+    engine.async_llm_client.chat.completions.create = AsyncMock(
+        return_value=mock_llm_client.chat.completions.create.return_value
+    )
+    return engine
+
+
+@pytest.fixture
+def mongo_client_with_mock_collection():
+    """Create MongoDB client wrapper around a mocked collection."""
+    client = MongoDBClient.__new__(MongoDBClient)
+    client.collection = Mock()
+    client.collection.aggregate.return_value = []
+    return client
 
 
 def test_retrieve_basic(rag_engine_with_mocks, mock_mongo_client, mock_embedding_client):
@@ -95,11 +127,8 @@ def test_build_prompt_token_limit(rag_engine_with_mocks):
     """Test prompt building with token limit."""
     query = "What is AI?"
 
-    # Create a very long document
-    long_text = "This is a very long document. " * 1000
-
     retrieved_docs = [
-        {"text": long_text, "score": 0.95, "metadata": {}},
+        {"text": _LONG_DOC, "score": 0.95, "metadata": {}},
     ]
 
     # Build prompt with small token limit
@@ -108,7 +137,20 @@ def test_build_prompt_token_limit(rag_engine_with_mocks):
     )
 
     # Prompt should be truncated
-    assert len(prompt) < len(long_text)
+    assert len(prompt) < len(_LONG_DOC)
+
+
+def test_build_prompt_uses_stored_token_count(rag_engine_with_mocks):
+    """Test chunks with a stored token count are not re-tokenized."""
+    retrieved_docs = [
+        {"text": "AI is artificial intelligence.", "score": 0.95, "metadata": {"token_count": 5}},
+    ]
+
+    with patch("app.rag_engine.calculate_token_counts", return_value=[]) as token_counts:
+        prompt = rag_engine_with_mocks.build_prompt("What is AI?", retrieved_docs)
+
+    token_counts.assert_called_once_with([])
+    assert "AI is artificial intelligence." in prompt
 
 
 def test_call_llm(rag_engine_with_mocks, mock_llm_client):
@@ -139,6 +181,23 @@ def test_call_llm_with_timeout(rag_engine_with_mocks, mock_llm_client):
         rag_engine_with_mocks.call_llm("Test prompt")
 
 
+def test_call_llm_retries_rate_limit(monkeypatch, rag_engine_with_mocks, mock_llm_client):
+    """Test a rate-limited LLM call is retried and then succeeds."""
+    monkeypatch.setattr("app.rag_engine.time.sleep", lambda seconds: None)
+    rate_limited = RateLimitError(
+        "Rate limit exceeded",
+        response=httpx.Response(429, request=httpx.Request("POST", "http://llm")),
+        body=None,
+    )
+    success = mock_llm_client.chat.completions.create.return_value
+    mock_llm_client.chat.completions.create.side_effect = [rate_limited, success]
+
+    response = rag_engine_with_mocks.call_llm("Test prompt")
+
+    assert response == "This is a mock answer to your question."
+    assert mock_llm_client.chat.completions.create.call_count == 2
+
+
 def test_query_full_pipeline(rag_engine_with_mocks):
     """Test full RAG query pipeline."""
     question = "What is machine learning?"
@@ -178,6 +237,75 @@ def test_query_no_results(rag_engine_with_mocks, mock_mongo_client):
     assert result["sources"] == []
 
 
+@pytest.mark.asyncio
+async def test_aquery_full_pipeline(rag_engine_with_mocks, mock_mongo_client):
+    """Test async RAG query uses the async LLM client."""
+    result = await rag_engine_with_mocks.aquery("What is machine learning?", top_k=5)
+
+    assert result["answer"] == "This is a mock answer to your question."
+    assert len(result["sources"]) == len(mock_mongo_client.mongo_knn_search.return_value)
+    rag_engine_with_mocks.async_llm_client.chat.completions.create.assert_awaited_once()
+    rag_engine_with_mocks.llm_client.chat.completions.create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_aquery_no_results(rag_engine_with_mocks, mock_mongo_client):
+    """Test async query when no documents are retrieved."""
+    mock_mongo_client.mongo_knn_search.return_value = []
+
+    result = await rag_engine_with_mocks.aquery("What is X?")
+
+    assert "couldn't find" in result["answer"].lower()
+    assert result["sources"] == []
+    rag_engine_with_mocks.async_llm_client.chat.completions.create.assert_not_called()
+
+
+def test_query_answer_cache_hit(rag_engine_with_mocks, mock_mongo_client):
+    """Test repeated questions are answered from the answer cache."""
+    rag_engine_with_mocks.answer_cache = AnswerCache(max_entries=10, threshold=0.97)
+
+    first = rag_engine_with_mocks.query("What is machine learning?", top_k=5)
+    second = rag_engine_with_mocks.query("  what is MACHINE learning? ", top_k=5)
+
+    assert second["answer"] == first["answer"]
+    assert second["sources"] == first["sources"]
+    mock_mongo_client.mongo_knn_search.assert_called_once()
+    rag_engine_with_mocks.llm_client.chat.completions.create.assert_called_once()
+
+
+def test_answer_cache_similarity_and_params():
+    """Test semantic hits need both a close embedding and the same parameters."""
+    cache = AnswerCache(max_entries=2, threshold=0.97)
+    vector = np.array([1.0, 0.0], dtype=np.float32)
+    params = AnswerCache.params_key(5, None, 0.7)
+    cache.put("What is AI?", vector, params, {"answer": "a"})
+
+    near = np.array([0.99, 0.141], dtype=np.float32)
+    far = np.array([0.0, 1.0], dtype=np.float32)
+    assert cache.get_similar(near, params) == {"answer": "a"}
+    assert cache.get_similar(far, params) is None
+    assert cache.get_similar(near, AnswerCache.params_key(3, None, 0.7)) is None
+
+    # Oldest entry is evicted once the cache is full
+    cache.put("q2", far, params, {"answer": "b"})
+    cache.put("q3", far, params, {"answer": "c"})
+    assert cache.get_similar(vector, params) is None
+    assert cache.get_exact("what is ai?", params) is None
+
+
+@pytest.mark.asyncio
+async def test_abatch_query(rag_engine_with_mocks, mock_embedding_client, mock_mongo_client):
+    """Test batch queries embed once and answer each question."""
+    questions = ["What is AI?", "What is ML?"]
+
+    results = await rag_engine_with_mocks.abatch_query(questions, top_k=5)
+
+    assert [r["answer"] for r in results] == ["This is a mock answer to your question."] * 2
+    mock_embedding_client.get_embeddings_batch.assert_called_once_with(questions)
+    mock_embedding_client.get_embedding.assert_not_called()
+    assert mock_mongo_client.mongo_knn_search.call_count == 2
+
+
 def test_query_with_error_handling(rag_engine_with_mocks, mock_embedding_client):
     """Test query error handling."""
     # Mock embedding error
@@ -198,3 +326,164 @@ def test_retrieve_custom_top_k(rag_engine_with_mocks, mock_mongo_client):
         # Verify top_k was passed correctly
         call_args = mock_mongo_client.mongo_knn_search.call_args
         assert call_args.kwargs["top_k"] == k
+
+
+def test_pack_embedding(mock_embedding):
+    """Test embeddings are packed as float32 BSON binary vectors."""
+    packed = pack_embedding(mock_embedding)
+
+    assert packed.subtype == VECTOR_SUBTYPE
+    # 2-byte header (dtype, padding) + 4 bytes per dimension
+    assert len(packed) == 2 + 4 * len(mock_embedding)
+    assert packed == Binary.from_vector(mock_embedding, BinaryVectorDtype.FLOAT32)
+
+
+def test_knn_search_pipeline(mongo_client_with_mock_collection, mock_embedding):
+    """Test numCandidates scaling and pre-filtering in the search stage."""
+    filters = {"metadata.source_file": "test.txt"}
+
+    mongo_client_with_mock_collection.mongo_knn_search(
+        mock_embedding, top_k=10, filter_criteria=filters
+    )
+
+    call_args = mongo_client_with_mock_collection.collection.aggregate.call_args
+    pipeline = call_args.args[0]
+    vector_search = pipeline[0]["$vectorSearch"]
+
+    assert call_args.kwargs["batchSize"] == 10
+    assert call_args.kwargs["allowDiskUse"] is False
+
+    assert vector_search["queryVector"] == pack_embedding(mock_embedding)
+    assert vector_search["numCandidates"] == 150
+    assert vector_search["limit"] == 10
+    assert vector_search["filter"] == filters
+    assert not any("$match" in stage for stage in pipeline)
+    assert set(pipeline[1]["$project"]) == {"_id", "score", "text", "metadata"}
+
+
+def test_knn_search_binary_prefilter_skipped_with_filters(
+    monkeypatch, mongo_client_with_mock_collection, mock_embedding
+):
+    """Test the binary prefilter narrows unfiltered searches only."""
+    monkeypatch.setattr("app.db.settings.USE_BINARY_PREFILTER", True)
+    client = mongo_client_with_mock_collection
+    client._binary_index = Mock()
+    client._binary_index.candidates.return_value = ["doc_1", "doc_2"]
+    filters = {"metadata.source_file": "test.txt"}
+
+    client.mongo_knn_search(mock_embedding, top_k=2, filter_criteria=filters)
+    vector_search = client.collection.aggregate.call_args.args[0][0]["$vectorSearch"]
+
+    assert vector_search["filter"] == filters
+    client._binary_index.candidates.assert_not_called()
+
+    client.mongo_knn_search(mock_embedding, top_k=2)
+    vector_search = client.collection.aggregate.call_args.args[0][0]["$vectorSearch"]
+
+    assert vector_search["filter"] == {"_id": {"$in": ["doc_1", "doc_2"]}}
+
+
+def test_knn_search_ids_only(mongo_client_with_mock_collection, mock_embedding):
+    """Test an empty field list projects only IDs and scores."""
+    mongo_client_with_mock_collection.mongo_knn_search(
+        mock_embedding, top_k=3, fields=[]
+    )
+
+    pipeline = mongo_client_with_mock_collection.collection.aggregate.call_args.args[0]
+    assert set(pipeline[1]["$project"]) == {"_id", "score"}
+
+
+def test_upsert_documents_bulk_batches(mongo_client_with_mock_collection, mock_embedding):
+    """Test bulk upserts are split into unordered bulk_write batches."""
+    documents = [
+        {"doc_id": f"doc_{i}", "text": f"Text {i}", "embedding": mock_embedding}
+        for i in range(5)
+    ]
+
+    doc_ids = mongo_client_with_mock_collection.upsert_documents_bulk(
+        documents, batch_size=2
+    )
+
+    bulk_write = mongo_client_with_mock_collection.collection.bulk_write
+    assert bulk_write.call_count == 3
+    assert all(call.kwargs["ordered"] is False for call in bulk_write.call_args_list)
+    assert doc_ids == [f"doc_{i}" for i in range(5)]
+
+
+def test_upsert_documents_bulk_partial_failure(
+    mongo_client_with_mock_collection, mock_embedding
+):
+    """Test a failed unordered batch is reported and re-raised."""
+    documents = [
+        {"doc_id": f"doc_{i}", "text": f"Text {i}", "embedding": mock_embedding}
+        for i in range(3)
+    ]
+    bulk_write = mongo_client_with_mock_collection.collection.bulk_write
+    bulk_write.side_effect = BulkWriteError(
+        {
+            "nUpserted": 2,
+            "nModified": 0,
+            "writeErrors": [{"index": 1, "code": 11000, "op": {"_id": "doc_1"}}],
+        }
+    )
+
+    with pytest.raises(BulkWriteError):
+        mongo_client_with_mock_collection.upsert_documents_bulk(documents)
+
+    assert bulk_write.call_args.kwargs["ordered"] is False
+
+
+def test_binary_code_index_candidates():
+    """Test Hamming-distance candidates favour vectors with matching signs."""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((20, 64)).astype(np.float32)
+
+    collection = Mock()
+    collection.find.return_value = [
+        {"_id": f"doc_{i}", "embedding_bq": pack_binary_code(v)}
+        for i, v in enumerate(vectors)
+    ]
+    collection.count_documents.return_value = len(vectors)
+    index = BinaryCodeIndex(collection)
+
+    candidates = index.candidates(vectors[7], num_candidates=3)
+
+    assert len(pack_binary_code(vectors[0])) == 64 // 8
+    assert len(candidates) == 3
+    assert "doc_7" in candidates
+
+
+def test_binary_code_index_partial_coverage():
+    """Test no candidates are returned while some documents lack binary codes."""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((20, 64)).astype(np.float32)
+
+    collection = Mock()
+    collection.find.return_value = [
+        {"_id": f"doc_{i}", "embedding_bq": pack_binary_code(v)}
+        for i, v in enumerate(vectors)
+    ]
+    collection.count_documents.return_value = 100  # 80 documents predate the codes
+    index = BinaryCodeIndex(collection)
+
+    assert index.candidates(vectors[7], num_candidates=3) == []
+
+
+def test_local_numpy_index_search():
+    """Test the NumPy index ranks documents by cosine similarity."""
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((20, 64)).astype(np.float32)
+
+    collection = Mock()
+    collection.find.return_value = [
+        {"_id": f"doc_{i}", "text": f"text {i}", "embedding": pack_embedding(v)}
+        for i, v in enumerate(vectors)
+    ]
+    index = LocalNumpyIndex(collection)
+
+    results = index.search(vectors[7] * 3.0, top_k=3)
+
+    assert len(results) == 3
+    assert results[0]["_id"] == "doc_7"
+    assert results[0]["score"] == pytest.approx(1.0)
+    assert results[0]["score"] >= results[1]["score"] >= results[2]["score"]
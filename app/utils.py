@@ -1,14 +1,20 @@
 """Utility functions including structured JSON logging."""
 
+import functools
 import json
 import logging
 import sys
-from datetime import datetime
-from typing import Any, Dict
+import time
+from typing import Any, Dict, List
 from pythonjsonlogger import jsonlogger
 
 from app.config import settings
 
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a character estimate
+    tiktoken = None
+
 
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
     """Custom JSON formatter with timestamp and standard fields."""
@@ -16,7 +22,9 @@ class CustomJsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record: Dict, record: logging.LogRecord, message_dict: Dict):
         """Add custom fields to log record."""
         super().add_fields(log_record, record, message_dict)
-        log_record["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        # Format the creation time logging already stamped on the record
+        created = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+        log_record["timestamp"] = f"{created}.{int(record.msecs):03d}Z"
         log_record["level"] = record.levelname
         if not log_record.get("event"):
             log_record["event"] = record.getMessage()
@@ -41,6 +49,21 @@ def setup_logging():
     return logger
 
 
+_LOGGER = logging.getLogger(__name__)
+
+# Bound logging methods per level name, resolved once instead of per event
+_LEVEL_FUNCS = {
+    "DEBUG": _LOGGER.debug,
+    "INFO": _LOGGER.info,
+    "WARNING": _LOGGER.warning,
+    "ERROR": _LOGGER.error,
+    "CRITICAL": _LOGGER.critical,
+}
+
+# Shared context for events logged without one (never mutated)
+_EMPTY_CONTEXT: Dict[str, Any] = {}
+
+
 def log_event(event: str, context: Dict[str, Any] = None, level: str = "INFO"):
     """
     Log a structured event with context.
@@ -50,11 +73,14 @@ def log_event(event: str, context: Dict[str, Any] = None, level: str = "INFO"):
         context: Additional context data
         level: Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
     """
-    logger = logging.getLogger(__name__)
-    log_func = getattr(logger, level.lower())
+    log_func = _LEVEL_FUNCS.get(level) or getattr(_LOGGER, level.lower())
+    log_func(event, extra={"context": context or _EMPTY_CONTEXT})
+
 
-    context = context or {}
-    log_func(event, extra={"context": context})
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Look up (and keep) the tiktoken encoding for a model."""
+    return tiktoken.encoding_for_model(model)
 
 
 def calculate_token_count(text: str, model: str = "gpt-4") -> int:
@@ -68,21 +94,52 @@ def calculate_token_count(text: str, model: str = "gpt-4") -> int:
     Returns:
         Estimated token count
     """
-    try:
-        import tiktoken
+    if tiktoken is None:
+        return len(text) // 4
 
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
+    try:
+        encoding = _get_encoding(model)
+        return len(encoding.encode_ordinary(text))
     except Exception as e:
         # Fallback: rough estimate (1 token ~= 4 characters)
         log_event("token_count_fallback", {"error": str(e)}, level="WARNING")
         return len(text) // 4
 
 
+def calculate_token_counts(texts: List[str], model: str = "gpt-4") -> List[int]:
+    """
+    Estimate token counts for several texts in one tokenizer call.
+
+    tiktoken's batch encoder tokenizes the texts in parallel threads.
+
+    Args:
+        texts: Input texts
+        model: Model name for tokenization
+
+    Returns:
+        Estimated token count per text, in input order
+    """
+    if not texts:
+        return []
+    if tiktoken is None:
+        return [len(text) // 4 for text in texts]
+
+    try:
+        encoding = _get_encoding(model)
+        return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+    except Exception as e:
+        # Fallback: rough estimate (1 token ~= 4 characters)
+        log_event("token_count_fallback", {"error": str(e)}, level="WARNING")
+        return [len(text) // 4 for text in texts]
+
+
 def truncate_text(text: str, max_tokens: int, model: str = "gpt-4") -> str:
     """
     Truncate text to a maximum token count.
 
+    Only a prefix of max_tokens * 8 characters is tokenized, so very long
+    inputs cost O(max_tokens) rather than O(len(text)).
+
     Args:
         text: Input text
         max_tokens: Maximum number of tokens
@@ -91,14 +148,18 @@ def truncate_text(text: str, max_tokens: int, model: str = "gpt-4") -> str:
     Returns:
         Truncated text
     """
+    if tiktoken is None:
+        return text[: max_tokens * 4]
+
     try:
-        import tiktoken
+        encoding = _get_encoding(model)
 
-        encoding = tiktoken.encoding_for_model(model)
-        tokens = encoding.encode(text)
+        # English averages ~4 characters per token, so 8 leaves ample margin
+        prefix = text[: max_tokens * 8]
+        tokens = encoding.encode_ordinary(prefix)
 
         if len(tokens) <= max_tokens:
-            return text
+            return prefix
 
         truncated_tokens = tokens[:max_tokens]
         return encoding.decode(truncated_tokens)
@@ -110,3 +171,10 @@ def truncate_text(text: str, max_tokens: int, model: str = "gpt-4") -> str:
 
 # Initialize logging on module import
 setup_logging()
+
+if tiktoken is None:
+    log_event(
+        "tiktoken_unavailable",
+        {"fallback": "1 token ~= 4 characters"},
+        level="WARNING",
+    )
@@ -1,9 +1,11 @@
 """Streamlit frontend for mini-lumina RAG system."""
 
+import json
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional
 
 # Configure page
 st.set_page_config(
@@ -15,34 +17,85 @@ st.set_page_config(
 
 # Backend URL
 BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+_HEALTH_URL = f"{BACKEND_URL}/healthz"
+_ASK_STREAM_URL = f"{BACKEND_URL}/ask_stream"
+_ASK_BATCH_URL = f"{BACKEND_URL}/ask_batch"
 
 
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Get the HTTP session shared across Streamlit reruns.
+
+    Streamlit re-executes this script on every interaction, so the session is
+    held in the resource cache to keep its pooled connections alive.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=5, show_spinner=False)
 def check_backend_health() -> bool:
-    """Check if backend is healthy."""
+    """Check if backend is healthy (cached briefly so reruns don't re-poll)."""
     try:
-        response = requests.get(f"{BACKEND_URL}/healthz", timeout=5)
+        response = get_session().get(_HEALTH_URL, timeout=5)
         return response.status_code == 200
     except Exception:
         return False
 
 
-def ask_question(
+def _sse_iter(response: requests.Response, meta: Dict[str, Any]) -> Iterator[str]:
+    """
+    Parse the /ask_stream server-sent events.
+
+    Yields answer text fragments; the sources and final latency are stored in
+    meta as they arrive.
+
+    Args:
+        response: Streaming response from /ask_stream
+        meta: Dict receiving "sources" and "latency_ms"
+    """
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:") :].strip())
+        elif not line and data:
+            payload = json.loads("\n".join(data))
+            if event == "token":
+                yield payload
+            elif event == "sources":
+                meta["sources"] = payload
+            elif event == "done":
+                meta.update(payload)
+            elif event == "error":
+                raise RuntimeError(payload)
+            event, data = "message", []
+
+
+def stream_answer(
     question: str,
+    meta: Dict[str, Any],
     top_k: int = 5,
     temperature: float = 0.7,
     filter_criteria: Dict[str, Any] = None,
-) -> Dict[str, Any]:
+) -> Optional[str]:
     """
-    Send question to backend API.
+    Stream the answer to a question into the page as it is generated.
 
     Args:
         question: User question
+        meta: Dict receiving "sources" and "latency_ms"
         top_k: Number of documents to retrieve
         temperature: LLM temperature
         filter_criteria: Optional metadata filters
 
     Returns:
-        API response
+        Full answer text, or None on error
     """
     try:
         payload = {
@@ -54,14 +107,65 @@ def ask_question(
         if filter_criteria:
             payload["filter_criteria"] = filter_criteria
 
-        response = requests.post(
-            f"{BACKEND_URL}/ask",
+        with get_session().post(
+            _ASK_STREAM_URL,
             json=payload,
             timeout=60,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            return st.write_stream(_sse_iter(response, meta))
+
+    except requests.exceptions.Timeout:
+        st.error("Request timed out. The backend might be processing a complex query.")
+        return None
+    except requests.exceptions.ConnectionError:
+        st.error(f"Cannot connect to backend at {BACKEND_URL}. Is it running?")
+        return None
+    except requests.exceptions.HTTPError as e:
+        st.error(f"API error: {e.response.status_code} - {e.response.text}")
+        return None
+    except Exception as e:
+        st.error(f"Unexpected error: {str(e)}")
+        return None
+
+
+def ask_questions(
+    questions: List[str],
+    top_k: int = 5,
+    temperature: float = 0.7,
+    filter_criteria: Dict[str, Any] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Send several questions to the backend in one batched request.
+
+    Args:
+        questions: User questions
+        top_k: Number of documents to retrieve per question
+        temperature: LLM temperature
+        filter_criteria: Optional metadata filters
+
+    Returns:
+        One API result per question, or None on error
+    """
+    try:
+        payload = {
+            "questions": questions,
+            "top_k": top_k,
+            "temperature": temperature,
+        }
+
+        if filter_criteria:
+            payload["filter_criteria"] = filter_criteria
+
+        response = get_session().post(
+            _ASK_BATCH_URL,
+            json=payload,
+            timeout=120,
         )
 
         response.raise_for_status()
-        return response.json()
+        return response.json()["results"]
 
     except requests.exceptions.Timeout:
         st.error("Request timed out. The backend might be processing a complex query.")
@@ -88,7 +192,10 @@ def main():
     with st.sidebar:
         st.header("⚙️ Settings")
 
-        # Backend health check
+        # Backend health check (cached; Refresh forces a new check)
+        if st.button("🔄 Refresh", key="refresh_health"):
+            check_backend_health.clear()
+
         if check_backend_health():
             st.success(f"✅ Connected to backend")
         else:
@@ -183,35 +290,43 @@ def main():
         if not question.strip():
             st.warning("Please enter a question.")
         else:
-            with st.spinner("Thinking..."):
-                result = ask_question(
-                    question=question,
-                    top_k=top_k,
-                    temperature=temperature,
-                    filter_criteria=filter_criteria,
-                )
-
-            if result:
-                st.markdown("---")
+            st.markdown("---")
+
+            # Display answer as it streams in
+            st.subheader("💡 Answer")
+            result = {}
+            answer = stream_answer(
+                question=question,
+                meta=result,
+                top_k=top_k,
+                temperature=temperature,
+                filter_criteria=filter_criteria,
+            )
 
-                # Display answer
-                st.subheader("💡 Answer")
-                st.markdown(result["answer"])
+            if answer is not None:
+                # A dropped connection can end the stream before "sources" or "done"
+                sources = result.get("sources", [])
+                latency_ms = result.get("latency_ms")
+                if latency_ms is None:
+                    st.warning("The answer stream ended early; the answer may be incomplete.")
 
                 # Display metadata
                 col1, col2 = st.columns(2)
                 with col1:
-                    st.metric("Response time", f"{result['latency_ms']:.0f} ms")
+                    st.metric(
+                        "Response time",
+                        f"{latency_ms:.0f} ms" if latency_ms is not None else "n/a",
+                    )
                 with col2:
-                    st.metric("Sources retrieved", len(result["sources"]))
+                    st.metric("Sources retrieved", len(sources))
 
                 st.markdown("---")
 
                 # Display sources
                 st.subheader("📚 Sources")
 
-                if result["sources"]:
-                    for i, source in enumerate(result["sources"], 1):
+                if sources:
+                    for i, source in enumerate(sources, 1):
                         with st.expander(
                             f"Source {i} (Score: {source['score']:.4f})",
                             expanded=(i == 1),
@@ -245,6 +360,22 @@ def main():
                 st.session_state.question = example
                 st.rerun()
 
+    # Answer all examples with one batched request
+    if st.button("Ask all examples", key="example_batch"):
+        with st.spinner("Thinking..."):
+            results = ask_questions(
+                example_questions,
+                top_k=top_k,
+                temperature=temperature,
+                filter_criteria=filter_criteria,
+            )
+
+        if results:
+            for example, result in zip(example_questions, results):
+                with st.expander(example, expanded=True):
+                    st.markdown(result["answer"])
+                    st.caption(f"{len(result['sources'])} sources")
+
     # Footer
     st.markdown("---")
     st.markdown(